@@ -0,0 +1,285 @@
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+# ================= ONLINE BACKUP ENGINE =================
+# Snapshots are taken with SQLite's online backup API, a few hundred pages per
+# step, on a background thread -- the GUI keeps writing while a copy is made,
+# and a write in the middle of a step simply restarts the copy instead of
+# producing a torn file. Each snapshot is gzip-compressed into BACKUP_DIR as
+# <db name>_YYYY-mm-dd_HH-MM-SS.db.gz, and the hourly / daily / monthly
+# retention policy decides which ones to keep. Snapshots are only taken when
+# the ledger has changed since the last one.
+BACKUP_DIR = "Backups"
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005            # seconds between steps, lets writers in
+INTERVAL_SECONDS = 30 * 60    # periodic snapshot (if anything changed)
+WRITES_PER_SNAPSHOT = 200     # ... or after this many written rows
+RETENTION = {"latest": 10, "hourly": 24, "daily": 14, "monthly": 12}
+
+SUFFIX = ".db.gz"
+STAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+def _prefix(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0] + "_"
+
+def list_snapshots(db_path, backup_dir=BACKUP_DIR):
+    """[(taken_at, path)] for db_path's snapshots, newest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = _prefix(db_path)
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not (name.startswith(prefix) and name.endswith(SUFFIX)):
+            continue
+        try:
+            taken_at = datetime.strptime(name[len(prefix):-len(SUFFIX)], STAMP_FORMAT)
+        except ValueError:
+            continue
+        snapshots.append((taken_at, os.path.join(backup_dir, name)))
+    snapshots.sort(reverse=True)
+    return snapshots
+
+def _copy_database(src_path, dst_path, pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    src = sqlite3.connect(src_path, timeout=30)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+
+def snapshot(db_path, backup_dir=BACKUP_DIR):
+    """Copy the live database page by page and store it compressed. Returns the snapshot path."""
+    os.makedirs(backup_dir, exist_ok=True)
+    taken_at = datetime.now()
+    path = os.path.join(backup_dir, f"{_prefix(db_path)}{taken_at.strftime(STAMP_FORMAT)}{SUFFIX}")
+    # The uncompressed copy goes to the system temp dir, never into backup_dir
+    fd, raw = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        _copy_database(db_path, raw)
+        with open(raw, "rb") as f_in, gzip.open(path + ".tmp", "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        # Only complete snapshots ever carry the final name
+        os.replace(path + ".tmp", path)
+    finally:
+        for leftover in (raw, path + ".tmp"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return path
+
+def remove_partials(db_path, backup_dir=BACKUP_DIR):
+    """Delete half-written snapshots (<name>.db.gz.tmp) left by an exit mid-snapshot. Returns the paths removed."""
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = _prefix(db_path)
+    removed = []
+    for name in os.listdir(backup_dir):
+        if name.startswith(prefix) and name.endswith(SUFFIX + ".tmp"):
+            path = os.path.join(backup_dir, name)
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                print(f"Backup Warning: {e}")
+    return removed
+
+def apply_retention(db_path, backup_dir=BACKUP_DIR, retention=RETENTION):
+    """Keep the last N snapshots plus the newest of each of the last N hours / days / months; delete the rest."""
+    snapshots = list_snapshots(db_path, backup_dir)
+    bucket_of = {
+        "latest": lambda t: t,
+        "hourly": lambda t: t.strftime("%Y-%m-%d %H"),
+        "daily": lambda t: t.strftime("%Y-%m-%d"),
+        "monthly": lambda t: t.strftime("%Y-%m"),
+    }
+    keep = set()
+    for policy, limit in retention.items():
+        seen = set()
+        for taken_at, path in snapshots:
+            bucket = bucket_of[policy](taken_at)
+            if bucket in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.add(bucket)
+            keep.add(path)
+    removed = []
+    for _, path in snapshots:
+        if path not in keep:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                print(f"Backup Warning: {e}")
+    return removed
+
+def _expand(snapshot_path):
+    # Decompress to a temporary .db file the caller must remove
+    fd, raw = tempfile.mkstemp(suffix=".db")
+    with os.fdopen(fd, "wb") as f_out, gzip.open(snapshot_path, "rb") as f_in:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    return raw
+
+def verify(snapshot_path):
+    """(ok, message): the snapshot decompresses, passes integrity_check and has the ledger table."""
+    raw = None
+    try:
+        raw = _expand(snapshot_path)
+        conn = sqlite3.connect(raw)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                return False, f"integrity check failed: {result}"
+            count = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+        finally:
+            conn.close()
+        return True, f"ok ({count} rows)"
+    except (OSError, EOFError, sqlite3.Error) as e:
+        return False, str(e)
+    finally:
+        if raw and os.path.exists(raw):
+            os.remove(raw)
+
+def restore(snapshot_path, db_path, backup_dir=BACKUP_DIR):
+    """Verify a snapshot, back up the current database, then copy the snapshot over it in place."""
+    ok, message = verify(snapshot_path)
+    if not ok:
+        raise ValueError(f"{snapshot_path}: {message}")
+    if os.path.exists(db_path):
+        snapshot(db_path, backup_dir)
+    raw = _expand(snapshot_path)
+    try:
+        # Copying into the live file through SQLite keeps other connections consistent
+        _copy_database(raw, db_path)
+    finally:
+        os.remove(raw)
+    return message
+
+def _changed_since(db_path, when):
+    # The main file or its WAL was written after `when`
+    for path in (db_path, db_path + "-wal"):
+        if os.path.exists(path) and datetime.fromtimestamp(os.path.getmtime(path)) > when:
+            return True
+    return False
+
+class BackupEngine:
+    def __init__(self, db_path, backup_dir=BACKUP_DIR, interval=INTERVAL_SECONDS,
+                 every_writes=WRITES_PER_SNAPSHOT, retention=RETENTION):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.every_writes = every_writes
+        self.retention = retention
+        self.last_snapshot = None
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        remove_partials(self.db_path, self.backup_dir)
+        self._thread = threading.Thread(target=self._run, name="backup-worker", daemon=True)
+        self._thread.start()
+
+    def note_write(self, rows=1):
+        """Count written rows; wakes the worker once every_writes is reached."""
+        with self._lock:
+            self._writes += rows
+            due = self._writes >= self.every_writes
+        if due:
+            self._wake.set()
+
+    def request(self):
+        with self._lock:
+            self._writes = max(self._writes, 1)
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        """Take a final snapshot if there are unsaved writes, then stop the worker."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _dirty(self):
+        with self._lock:
+            if self._writes:
+                return True
+        if self.last_snapshot is None:
+            snapshots = list_snapshots(self.db_path, self.backup_dir)
+            if not snapshots:
+                return os.path.exists(self.db_path)
+            self.last_snapshot = snapshots[0][0]
+        return _changed_since(self.db_path, self.last_snapshot)
+
+    def _run(self):
+        while True:
+            if self._dirty():
+                self._take_snapshot()
+            if self._stopping:
+                return
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _take_snapshot(self):
+        with self._lock:
+            writes, self._writes = self._writes, 0
+        try:
+            path = snapshot(self.db_path, self.backup_dir)
+            self.last_snapshot = list_snapshots(self.db_path, self.backup_dir)[0][0]
+            apply_retention(self.db_path, self.backup_dir, self.retention)
+            return path
+        except Exception as e:
+            # Keep the pending writes so the next wake-up tries again
+            with self._lock:
+                self._writes += writes
+            print(f"Backup Warning: {e}")
+            return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prawn Accounts backups")
+    parser.add_argument("--db", default="prawn_accounts.db")
+    parser.add_argument("--dir", default=BACKUP_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot", help="take a compressed snapshot now")
+    commands.add_parser("list", help="list snapshots, newest first")
+    commands.add_parser("prune", help="apply the retention policy")
+    cmd = commands.add_parser("verify", help="check a snapshot (default: newest)")
+    cmd.add_argument("snapshot", nargs="?")
+    cmd = commands.add_parser("restore", help="restore a snapshot over the database")
+    cmd.add_argument("snapshot")
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        print(snapshot(args.db, args.dir))
+    elif args.command == "list":
+        for taken_at, path in list_snapshots(args.db, args.dir):
+            print(f"{taken_at:%Y-%m-%d %H:%M:%S}  {os.path.getsize(path):>12,}  {path}")
+    elif args.command == "prune":
+        for path in remove_partials(args.db, args.dir) + apply_retention(args.db, args.dir):
+            print(f"removed {path}")
+    elif args.command == "verify":
+        path = args.snapshot
+        if path is None:
+            snapshots = list_snapshots(args.db, args.dir)
+            if not snapshots:
+                print("no snapshots")
+                return 1
+            path = snapshots[0][1]
+        ok, message = verify(path)
+        print(f"{path}: {message}")
+        return 0 if ok else 1
+    elif args.command == "restore":
+        print(f"restored {args.snapshot}: {restore(args.snapshot, args.db, args.dir)}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,437 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import threading
+import time
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from openpyxl import Workbook
+
+import operations
+from excel_import import count_rows, iter_import_rows
+from suggestions import SuggestionIndex
+
+# ================= SYNTHETIC COUNTER DAY =================
+CUSTOMERS = ["SWAMI", "PANASA RAMUDU", "KARTHIKEYA", "RAJU", "VENKATESH", "SURESH"]
+ITEMS = ["KADUSU", "PRAWNS", "FISH", "TIGER PRAWNS"]
+
+def make_row(sno):
+    qty = 10.0 + sno % 40
+    rate = 90.0 + (sno % 7) * 10
+    total = qty * rate
+    adv = 500.0 if sno % 3 == 0 else 0.0
+    return [sno, "18-01-2026", "12:00:00", CUSTOMERS[sno % len(CUSTOMERS)], ITEMS[sno % len(ITEMS)],
+            sno % 50, qty, rate, total, adv, max(total - adv, 0.0), "1234567891", "LANKA",
+            "Done" if sno % 2 else "Incomplete"]
+
+def one_entry(sno, after_each):
+    """What the GUI does for one cashier entry: S.NO focus, typing with suggestions, auto-fill, ADD, reload."""
+    calls = [
+        operations.peek_next_sno,                                   # auto_sno
+        *[operations.get_all_customer_names] * 5,                  # <KeyRelease> on CUSTOMER
+        lambda: operations.get_customer(CUSTOMERS[sno % 6]),       # auto_fill_details
+        *[operations.get_all_item_names] * 3,                      # <KeyRelease> on ITEM
+        lambda: operations.get_rate(ITEMS[sno % 4]),               # auto_fill_rate
+        lambda: operations.fetch_by_sno(sno),                      # duplicate check
+        lambda: operations.insert_record(make_row(sno)),           # ADD
+        lambda: operations.fetch_page(None, 100),                  # load_all
+    ]
+    for call in calls:
+        call()
+        after_each()
+
+@contextmanager
+def temp_database():
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    old_name = operations.DB_NAME
+    operations.DB_NAME = path
+    try:
+        yield path
+    finally:
+        operations.close_connection()
+        operations.DB_NAME = old_name
+        for leftover in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+def run(label, entries, after_each):
+    with temp_database():
+        start_connects = operations.connection_stats()["connects"]
+        operations.create_table()
+        t0 = time.perf_counter()
+        for sno in range(1, entries + 1):
+            one_entry(sno, after_each)
+        elapsed = time.perf_counter() - t0
+        connects = operations.connection_stats()["connects"] - start_connects
+    print(f"{label:<30} entries={entries:<6} connects={connects:<7} time={elapsed:8.3f}s  "
+          f"({elapsed / entries * 1000:.2f} ms/entry)")
+    return connects, elapsed
+
+def bench_connections(entries=200):
+    print("== connection manager ==")
+    # Old behaviour: every operations call opened and closed its own connection
+    old_c, old_t = run("connect-per-call (old)", entries, operations.close_connection)
+    new_c, new_t = run("persistent connection", entries, lambda: None)
+    print(f"connects saved: {old_c - new_c}  |  speedup: {old_t / new_t:.2f}x")
+
+def timed_import(label, rows, insert):
+    with temp_database():
+        operations.create_table()
+        t0 = time.perf_counter()
+        insert(rows)
+        elapsed = time.perf_counter() - t0
+    print(f"{label:<30} rows={len(rows):<7} time={elapsed:8.3f}s  ({len(rows) / elapsed:,.0f} rows/s)")
+    return len(rows) / elapsed
+
+def bench_import(n_rows=20000):
+    print("== excel import insert path ==")
+    rows = [make_row(sno) for sno in range(1, n_rows + 1)]
+
+    def per_row_connect(rows):
+        for r in rows:
+            operations.insert_record(r)
+            operations.close_connection()
+
+    def per_row_commit(rows):
+        for r in rows:
+            operations.insert_record(r)
+
+    old_rate = timed_import("insert_record + connect (old)", rows[:2000], per_row_connect)
+    timed_import("insert_record, 1 connection", rows[:2000], per_row_commit)
+    new_rate = timed_import("insert_many", rows, operations.insert_many)
+    print(f"import speedup: {new_rate / old_rate:.1f}x")
+
+# What every connection ran with before storage profiles existed
+OLD_STORAGE = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+def read_latency_during_import(rows):
+    # The GUI reloading its first page while the import thread writes
+    done = threading.Event()
+    errors = []
+
+    def importer():
+        try:
+            operations.insert_many(rows, chunk_size=1000)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    worker = threading.Thread(target=importer)
+    worker.start()
+    latencies = []
+    while not done.is_set():
+        t0 = time.perf_counter()
+        try:
+            operations.fetch_page(None, 100)
+        except Exception as e:
+            errors.append(e)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    worker.join()
+    return latencies, errors
+
+def bench_profiles(n_rows=20000, n_inserts=300):
+    print("== storage profiles ==")
+    operations.STORAGE_PROFILES.setdefault("journal (old)", OLD_STORAGE)
+    rows = [make_row(sno) for sno in range(1, n_rows + 1)]
+    previous = operations.storage_profile()
+    try:
+        for name in operations.STORAGE_PROFILES:
+            operations.set_storage_profile(name)
+            with temp_database():
+                operations.create_table()
+                t0 = time.perf_counter()
+                for r in rows[:n_inserts]:
+                    operations.insert_record(r)
+                insert_ms = (time.perf_counter() - t0) / n_inserts * 1000
+            with temp_database():
+                operations.create_table()
+                t0 = time.perf_counter()
+                operations.insert_many(rows)
+                import_rate = n_rows / (time.perf_counter() - t0)
+            with temp_database():
+                operations.create_table()
+                latencies, errors = read_latency_during_import(rows)
+            q = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+            print(f"{name:<14} insert={insert_ms:6.2f} ms/row  import={import_rate:9,.0f} rows/s  "
+                  f"read during import: p50={q[9]:6.2f} p95={q[18]:6.2f} max={max(latencies):7.2f} ms  "
+                  f"reads={len(latencies)} errors={len(errors)}")
+    finally:
+        operations.STORAGE_PROFILES.pop("journal (old)", None)
+        operations.set_storage_profile(previous)
+
+# ================= SYNTHETIC LEDGER =================
+# A seeded, realistic ledger: a few customers and items account for most rows
+# (Zipf-like weights), dates run forward through the ledger in dd-mm-YYYY
+# like the GUI writes them, and payment status mixes the spellings found in
+# real data. The same seed always produces the same ledger.
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+PAYMENT_MIX = [("Done", 55), ("Incomplete", 30), ("", 8), ("DONE", 5), ("IN COMPLETE", 2)]
+ITEM_NAMES = ["KADUSU", "PRAWNS", "TIGER PRAWNS", "VANNAMEI", "CHIPPA", "KATTIPARUGU", "KOYYINGA",
+              "SCAMPI", "PANDUGAPPA", "ROHU", "KORAMENU", "BOMMIDAI", "SORRA", "VANJARAM", "NETHALLU"]
+LOCATIONS = ["LANKA", "RAZOLE", "CHINTHADIBBA", "AMALAPURAM", "NARSAPUR", "PALAKOL", "BHIMAVARAM"]
+FIRST_DATE = date(2024, 1, 1)
+
+def zipf_weights(n, s=1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+def generate_ledger(n_rows, seed=42, start_sno=1):
+    """Yield n_rows accounts tuples (sno ... payment_status)."""
+    rng = random.Random(seed)
+    n_customers = max(50, n_rows // 200)
+    customers = [f"CUSTOMER {i:05d}" for i in range(n_customers)]
+    phones = [str(9000000000 + rng.randrange(10**9)) for _ in customers]
+    homes = [rng.choice(LOCATIONS) for _ in customers]
+    customer_cum = list(_cumulative(zipf_weights(n_customers)))
+    item_cum = list(_cumulative(zipf_weights(len(ITEM_NAMES), 0.9)))
+    base_rate = {item: 80.0 + 20 * i for i, item in enumerate(ITEM_NAMES)}
+    statuses = [p for p, _ in PAYMENT_MIX]
+    status_cum = list(_cumulative([w for _, w in PAYMENT_MIX]))
+    span_days = 2 * 365
+
+    for i in range(n_rows):
+        sno = start_sno + i
+        c = rng.choices(range(n_customers), cum_weights=customer_cum)[0]
+        item = rng.choices(ITEM_NAMES, cum_weights=item_cum)[0]
+        day = FIRST_DATE + timedelta(days=i * span_days // max(n_rows, 1))
+        qty = round(rng.uniform(1, 60), 1)
+        rate = base_rate[item] + 10 * rng.randrange(4)
+        total = qty * rate
+        adv = rng.choice((0.0, 0.0, 0.0, 500.0, 1000.0))
+        yield (sno, day.strftime("%d-%m-%Y"), "12:00:00", customers[c], item, rng.randrange(20, 60),
+               qty, rate, total, adv, max(total - adv, 0.0), phones[c], homes[c],
+               rng.choices(statuses, cum_weights=status_cum)[0])
+
+def _cumulative(weights):
+    acc = 0
+    for w in weights:
+        acc += w
+        yield acc
+
+def write_excel(path, rows):
+    """Save ledger rows as an import sheet (the columns import_excel_data reads)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["DATE", "CUSTOMER", "ITEM", "COUNT", "QUANTITY", "RATE", "ADVANCE", "PHONE", "LOCATION", "PAYMENT"])
+    for r in rows:
+        ws.append([r[1], r[3], r[4], r[5], r[6], r[7], r[9], r[11], r[12], r[13]])
+    wb.save(path)
+
+# ================= BENCHMARK SUITE =================
+# Times every operations.py entry point plus the composite paths main.py
+# runs for its buttons (load_all, SEARCH NAME, FILTER ITEM/PAY, VIEW MONTH),
+# without importing main.py (which opens the Tk window). Each result is
+# {calls, mean_ms, p50_ms, p95_ms, max_ms}; the report is plain JSON so two
+# runs can be compared with --compare.
+REPEAT = 20
+PAGE_SIZE = 100          # main.PAGE_SIZE
+IMPORT_ROWS_MAX = 50_000 # the Excel round trip is capped so 1M stays practical
+
+def measure(func, repeat=REPEAT):
+    """func(i) is called `repeat` times; returns latency stats in milliseconds."""
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func(i)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    q = statistics.quantiles(times, n=20, method="inclusive") if len(times) > 1 else times * 19
+    return {"calls": len(times), "mean_ms": round(statistics.fmean(times), 4), "p50_ms": round(q[9], 4),
+            "p95_ms": round(q[18], 4), "max_ms": round(times[-1], 4)}
+
+def suite_cases(n_rows, sample):
+    """(name, func(i), repeat) for a ledger of n_rows; sample holds real values from it."""
+    customer, item, month, snos = sample["customer"], sample["item"], sample["month"], sample["snos"]
+    heavy = 1 if n_rows > 100_000 else 3    # full-ledger reads
+    next_sno = [operations.peek_next_sno()]
+
+    def add(i):
+        sno = next_sno[0] + i
+        operations.insert_record(next(generate_ledger(1, seed=sno, start_sno=sno)))
+
+    def update(i):
+        row = operations.fetch_by_sno(snos[i % len(snos)])
+        operations.update_record([*row[1:], row[0]])
+
+    def load_all(i):
+        operations.fetch_page(None, PAGE_SIZE)
+        operations.fetch_totals(None)
+
+    def page_walk(i):
+        rows, cursor = operations.fetch_page(None, PAGE_SIZE)
+        for _ in range(10):
+            rows, cursor = operations.fetch_page(cursor, PAGE_SIZE)
+
+    def gui_filter(fetch, filters):
+        def run(i):
+            fetch()
+            operations.invalidate_totals()   # the footer's first query of a view is a cold one
+            operations.fetch_totals(filters)
+        return run
+
+    def delete_and_restore(i):
+        batch_id, _ = operations.delete_many(snos[:100])
+        operations.restore_trash(batch_id)
+
+    return [
+        ("to_iso_date", lambda i: operations.to_iso_date("18-01-2026"), 1000),
+        ("peek_next_sno", lambda i: operations.peek_next_sno(), REPEAT),
+        ("fetch_by_sno", lambda i: operations.fetch_by_sno(snos[i % len(snos)]), REPEAT),
+        ("get_customer", lambda i: operations.get_customer(customer), REPEAT),
+        ("get_rate.current", lambda i: operations.get_rate(item), REPEAT),
+        ("get_rate.as_of", lambda i: operations.get_rate(item, "15-03-2024"), REPEAT),
+        ("fetch_page.first", lambda i: operations.fetch_page(None, PAGE_SIZE), REPEAT),
+        ("fetch_page.deep", lambda i: operations.fetch_page(n_rows // 2, PAGE_SIZE), REPEAT),
+        ("fetch_page.prev", lambda i: operations.fetch_page(before_sno=n_rows // 2, limit=PAGE_SIZE), REPEAT),
+        ("fetch_totals.cold", lambda i: (operations.invalidate_totals(), operations.fetch_totals(None)), heavy),
+        ("fetch_totals.cached", lambda i: operations.fetch_totals(None), REPEAT),
+        ("fetch_by_customer", lambda i: operations.fetch_by_customer(customer), heavy),
+        ("fetch_by_payment", lambda i: operations.fetch_by_payment("incomplete"), heavy),
+        ("fetch_by_item", lambda i: operations.fetch_by_item(item[:4]), heavy),
+        ("fetch_by_month", lambda i: operations.fetch_by_month(*month), REPEAT),
+        ("fetch_by_date_range", lambda i: operations.fetch_by_date_range("01-02-2024", "07-02-2024"), REPEAT),
+        ("search.customer", lambda i: operations.search(customer[-5:], fields=("customer_name",)), heavy),
+        ("search.all_fields", lambda i: operations.search(item[1:5]), heavy),
+        ("search.short", lambda i: operations.search("KA", limit=PAGE_SIZE), heavy),
+        ("get_all_customer_names", lambda i: operations.get_all_customer_names(), heavy),
+        ("get_all_item_names", lambda i: operations.get_all_item_names(), heavy),
+        ("get_customer_name_counts", lambda i: operations.get_customer_name_counts(), heavy),
+        ("get_item_name_counts", lambda i: operations.get_item_name_counts(), heavy),
+        ("fetch_all", lambda i: operations.fetch_all(), 1),
+        ("insert_record", add, REPEAT),
+        ("update_record", update, REPEAT),
+        ("settle_payments.snos", lambda i: operations.settle_payments(snos=snos[:100]), 3),
+        ("settle_payments.customer", lambda i: operations.settle_payments(customer=customer), 1),
+        ("delete_many+restore_trash.100", delete_and_restore, 3),
+        ("list_trash", lambda i: operations.list_trash(), REPEAT),
+        ("purge_trash", lambda i: operations.purge_trash(), 3),
+        ("main.load_all", load_all, REPEAT),
+        ("main.next_page x10", page_walk, REPEAT),
+        ("main.search_name", gui_filter(lambda: operations.search(customer, fields=("customer_name",)),
+                                        {"customer": customer}), heavy),
+        ("main.filter_item", gui_filter(lambda: operations.fetch_by_item(item), {"item": item}), heavy),
+        ("main.filter_pay", gui_filter(lambda: operations.fetch_by_payment("Incomplete"),
+                                       {"payment": "Incomplete"}), heavy),
+        ("main.view_month", gui_filter(lambda: operations.fetch_by_month(*month), {"month": month}), REPEAT),
+    ]
+
+def bench_suggestions(results):
+    counts = operations.get_customer_name_counts()
+    t0 = time.perf_counter()
+    index = SuggestionIndex.from_counts(counts)
+    results["suggestions.build"] = {"calls": 1, "mean_ms": round((time.perf_counter() - t0) * 1000, 4)}
+    results["suggestions.search"] = measure(lambda i: index.search(("CUST", "OMER 0", "012")[i % 3]), 300)
+
+def bench_excel_import(n_rows, seed, results):
+    n = min(n_rows, IMPORT_ROWS_MAX)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_excel(path, generate_ledger(n, seed))
+        results["excel.count_rows"] = measure(lambda i: count_rows(path), 3)
+        with temp_database():
+            operations.create_table()
+            t0 = time.perf_counter()
+            inserted = sum(operations.insert_many(rows) for rows in iter_import_rows(path, operations.allocate_snos))
+            elapsed = time.perf_counter() - t0
+        results["excel.import"] = {"calls": 1, "rows": inserted, "mean_ms": round(elapsed * 1000, 4),
+                                   "rows_per_s": round(inserted / elapsed)}
+    finally:
+        os.remove(path)
+
+def bench_suite(sizes, seed=42, progress=print):
+    report = {"meta": {"started": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "platform": platform.platform(), "storage_profile": operations.storage_profile(),
+                       "seed": seed},
+              "results": {}}
+    for label in sizes:
+        n_rows = SIZES[label]
+        results = {}
+        with temp_database():
+            operations.create_table()
+            t0 = time.perf_counter()
+            rows = list(generate_ledger(n_rows, seed))
+            results["generate_ledger"] = {"calls": 1, "mean_ms": round((time.perf_counter() - t0) * 1000, 4)}
+            t0 = time.perf_counter()
+            operations.insert_many(rows)
+            elapsed = time.perf_counter() - t0
+            results["insert_many"] = {"calls": 1, "rows": n_rows, "mean_ms": round(elapsed * 1000, 4),
+                                      "rows_per_s": round(n_rows / elapsed)}
+            t0 = time.perf_counter()
+            operations.close_connection()
+            operations.create_table()   # what every app start runs against the existing ledger
+            results["create_table.existing"] = {"calls": 1, "mean_ms": round((time.perf_counter() - t0) * 1000, 4)}
+
+            top_customer = max(operations.get_customer_name_counts(), key=lambda c: c[1])[0]
+            day = datetime.strptime(rows[n_rows // 3][1], "%d-%m-%Y")
+            sample = {"customer": top_customer, "item": ITEM_NAMES[0], "month": (f"{day.month:02d}", str(day.year)),
+                      "snos": [rows[(i * 7919) % n_rows][0] for i in range(200)]}
+            del rows
+            for name, func, repeat in suite_cases(n_rows, sample):
+                results[name] = measure(func, repeat)
+                progress(f"  {label:>5} {name:<32} p50={results[name]['p50_ms']:9.3f} ms  "
+                         f"max={results[name]['max_ms']:9.3f} ms")
+            bench_suggestions(results)
+        bench_excel_import(n_rows, seed, results)
+        report["results"][label] = results
+    return report
+
+def compare_reports(old, new, threshold=0.10):
+    """Print p50 (or mean) old -> new per operation; ratios beyond threshold are flagged."""
+    for label, results in new["results"].items():
+        before = old.get("results", {}).get(label)
+        if not before:
+            continue
+        print(f"== {label}: {old['meta'].get('started')} -> {new['meta'].get('started')} ==")
+        for name, stats in results.items():
+            if name not in before:
+                continue
+            key = "p50_ms" if "p50_ms" in stats and "p50_ms" in before[name] else "mean_ms"
+            a, b = before[name][key], stats[key]
+            ratio = b / a if a else float("inf")
+            flag = "  slower" if ratio > 1 + threshold else ("  faster" if ratio < 1 - threshold else "")
+            print(f"  {name:<32} {a:10.3f} -> {b:10.3f} ms  x{ratio:5.2f}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prawn Accounts benchmarks (headless)")
+    commands = parser.add_subparsers(dest="command")
+    cmd = commands.add_parser("suite", help="time every data-layer path on synthetic ledgers (default)")
+    cmd.add_argument("--sizes", default="10k,100k", help=f"comma list of {', '.join(SIZES)}")
+    cmd.add_argument("--seed", type=int, default=42)
+    cmd.add_argument("--out", default="benchmark_report.json")
+    cmd.add_argument("--compare", help="earlier report to compare against")
+    cmd = commands.add_parser("micro", help="connection, import and storage-profile comparisons")
+    cmd.add_argument("n", type=int, nargs="?", default=200)
+    args = parser.parse_args(argv)
+
+    if args.command == "micro":
+        bench_connections(args.n)
+        bench_import(args.n * 100)
+        bench_profiles(args.n * 100)
+        return 0
+
+    sizes = [s.strip() for s in getattr(args, "sizes", "10k,100k").split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    report = bench_suite(sizes, getattr(args, "seed", 42))
+    out = getattr(args, "out", "benchmark_report.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {out}")
+    previous = getattr(args, "compare", None)
+    if previous:
+        with open(previous) as f:
+            compare_reports(json.load(f), report)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,51 @@
 import tkinter as tk
 from tkinter import messagebox
 import os
+from collections import OrderedDict
 from PIL import Image, ImageTk, ImageGrab
 
+# ================= BACKGROUND ASSET CACHE =================
+# bgimg.jpg is decoded once per process, straight at a reduced scale (JPEG
+# draft mode) that still covers a bill window as big as the screen. Resized
+# variants are kept per window size, so reopening a bill or going back to a
+# size already seen costs nothing. While a window is being dragged only the
+# text is redrawn; the LANCZOS resample runs once the size has settled.
+BG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bgimg.jpg")
+VARIANTS_KEPT = 6
+RESIZE_SETTLE_MS = 150
+
+_bg = {"image": None, "failed": False}
+_bg_variants = OrderedDict()   # (w, h) -> PhotoImage
+
+def background_image(screen_size):
+    """The decoded background (None if it is missing or unreadable), loaded on first use."""
+    if _bg["image"] is None and not _bg["failed"]:
+        try:
+            img = Image.open(BG_FILE)
+            # Reduced only if the smaller image still covers the screen in both
+            # directions, so a maximised or wide bill window is never upscaled
+            img.draft("RGB", screen_size)
+            _bg["image"] = img.convert("RGB")
+        except Exception as e:
+            print(f"Error opening image: {e}")
+            _bg["failed"] = True
+    return _bg["image"]
+
+def background_photo(w, h, screen_size):
+    """PhotoImage of the background at exactly w x h (LRU of the last VARIANTS_KEPT sizes)."""
+    key = (w, h)
+    if key in _bg_variants:
+        _bg_variants.move_to_end(key)
+        return _bg_variants[key]
+    base = background_image(screen_size)
+    if base is None:
+        return None
+    photo = ImageTk.PhotoImage(base.resize(key, Image.Resampling.LANCZOS))
+    _bg_variants[key] = photo
+    while len(_bg_variants) > VARIANTS_KEPT:
+        _bg_variants.popitem(last=False)
+    return photo
+
 def show_bill(record):
     # --- 1. Create Window ---
     bill_win = tk.Toplevel()
@@ -14,35 +57,43 @@ def show_bill(record):
     c = tk.Canvas(bill_win, bg="white")
     c.pack(fill="both", expand=True)
 
-    # --- 3. Load Image Logic ---
+    # --- 3. Background (shared cache, see above) ---
     current_folder = os.path.dirname(os.path.abspath(__file__))
-    img_path = os.path.join(current_folder, "bgimg.jpg") 
-    
-    original_image = None
-    if os.path.exists(img_path):
+    screen_size = (bill_win.winfo_screenwidth(), bill_win.winfo_screenheight())
+    bg_item = c.create_image(0, 0, anchor="nw")
+    pending = {"job": None}
+
+    def draw_background():
+        pending["job"] = None
+        if not c.winfo_exists(): return
+        w, h = c.winfo_width(), c.winfo_height()
+        if w < 10 or h < 10: return
         try:
-            original_image = Image.open(img_path)
+            bg_photo = background_photo(w, h, screen_size)
         except Exception as e:
-            print(f"Error opening image: {e}")
+            print(f"Error drawing background: {e}")
+            return
+        if bg_photo:
+            c.image_ref = bg_photo
+            c.itemconfigure(bg_item, image=bg_photo)
 
-    # --- 4. The Draw Function ---
+    # --- 4. The Draw Function (text only; the buttons are made once below) ---
     def draw_content(event=None):
         w = c.winfo_width()
         h = c.winfo_height()
         
         if w < 10 or h < 10: return
 
-        c.delete("all")
-
-        # A. Draw Background
-        if original_image:
-            try:
-                resized_image = original_image.resize((w, h), Image.Resampling.LANCZOS)
-                bg_photo = ImageTk.PhotoImage(resized_image)
-                c.image_ref = bg_photo
-                c.create_image(0, 0, image=bg_photo, anchor="nw")
-            except:
-                pass
+        c.delete("content")
+
+        # A. Background: the first draw and sizes already cached are shown at
+        # once, otherwise it is resampled when the window stops changing size
+        if pending["job"]:
+            c.after_cancel(pending["job"])
+        if (w, h) in _bg_variants or not hasattr(c, "image_ref"):
+            draw_background()
+        else:
+            pending["job"] = c.after(RESIZE_SETTLE_MS, draw_background)
         
         # B. Draw Header & Data
         center_x = w / 2
@@ -54,7 +105,7 @@ def show_bill(record):
         F_NORMAL = ("Arial", 12)
 
         # Header Text
-        c.create_text(center_x, 60, text="INVOICE / RECEIPT", font=F_HEADER, fill="black")
+        c.create_text(center_x, 60, text="INVOICE / RECEIPT", font=F_HEADER, fill="black", tags="content")
 
         # Unpack Record
         r_date, r_time = record[1], record[2]
@@ -73,83 +124,82 @@ def show_bill(record):
         start_y = 130
         gap = 30
         
-        c.create_text(left_margin, start_y, text=f"Date: {r_date}   Time: {r_time}", font=F_NORMAL, anchor="w", fill="black")
-        c.create_text(left_margin, start_y + gap, text=f"Customer: {r_customer}", font=F_SUB, anchor="w", fill="black")
-        c.create_text(left_margin, start_y + gap*2, text=f"Phone: {r_phone}", font=F_NORMAL, anchor="w", fill="black")
-        c.create_text(left_margin, start_y + gap*3, text=f"Location: {r_location}", font=F_NORMAL, anchor="w", fill="black")
+        c.create_text(left_margin, start_y, text=f"Date: {r_date}   Time: {r_time}", font=F_NORMAL, anchor="w", fill="black", tags="content")
+        c.create_text(left_margin, start_y + gap, text=f"Customer: {r_customer}", font=F_SUB, anchor="w", fill="black", tags="content")
+        c.create_text(left_margin, start_y + gap*2, text=f"Phone: {r_phone}", font=F_NORMAL, anchor="w", fill="black", tags="content")
+        c.create_text(left_margin, start_y + gap*3, text=f"Location: {r_location}", font=F_NORMAL, anchor="w", fill="black", tags="content")
         
-        c.create_line(left_margin, start_y + gap*4.5, w - left_margin, start_y + gap*4.5, width=2, fill="black")
+        c.create_line(left_margin, start_y + gap*4.5, w - left_margin, start_y + gap*4.5, width=2, fill="black", tags="content")
 
         item_y = start_y + gap*6
-        c.create_text(left_margin, item_y, text=f"Item: {r_item}", font=F_SUB, anchor="w", fill="black")
-        c.create_text(left_margin, item_y + gap, text=f"Count: {r_count}", font=F_NORMAL, anchor="w", fill="black")
-        c.create_text(center_x + 50, item_y + gap, text=f"Quantity: {r_qty} kg", font=F_NORMAL, anchor="w", fill="black")
-        c.create_text(left_margin, item_y + gap*2, text=f"Rate: {r_rate}", font=F_NORMAL, anchor="w", fill="black")
+        c.create_text(left_margin, item_y, text=f"Item: {r_item}", font=F_SUB, anchor="w", fill="black", tags="content")
+        c.create_text(left_margin, item_y + gap, text=f"Count: {r_count}", font=F_NORMAL, anchor="w", fill="black", tags="content")
+        c.create_text(center_x + 50, item_y + gap, text=f"Quantity: {r_qty} kg", font=F_NORMAL, anchor="w", fill="black", tags="content")
+        c.create_text(left_margin, item_y + gap*2, text=f"Rate: {r_rate}", font=F_NORMAL, anchor="w", fill="black", tags="content")
 
-        c.create_line(left_margin, item_y + gap*3.5, w - left_margin, item_y + gap*3.5, width=2, fill="black")
+        c.create_line(left_margin, item_y + gap*3.5, w - left_margin, item_y + gap*3.5, width=2, fill="black", tags="content")
 
         money_y = item_y + gap*5
         money_x = center_x + 100 
 
-        c.create_text(money_x, money_y, text=f"Total Bill:   {r_total}", font=F_SUB, anchor="e", fill="black")
-        c.create_text(money_x, money_y + gap, text=f"Advance:   -{r_advance}", font=F_NORMAL, anchor="e", fill="red")
-        c.create_text(money_x, money_y + gap*2, text=f"Balance:    {r_balance}", font=("Arial", 18, "bold"), anchor="e", fill="green")
+        c.create_text(money_x, money_y, text=f"Total Bill:   {r_total}", font=F_SUB, anchor="e", fill="black", tags="content")
+        c.create_text(money_x, money_y + gap, text=f"Advance:   -{r_advance}", font=F_NORMAL, anchor="e", fill="red", tags="content")
+        c.create_text(money_x, money_y + gap*2, text=f"Balance:    {r_balance}", font=("Arial", 18, "bold"), anchor="e", fill="green", tags="content")
 
         # Footer Message
-        c.create_text(left_margin, h - 140, text="CEO & FOUNDER: Lanke venkateswarlu", font=("Arial", 8, "italic"), fill="#333333", anchor="w")
-
-        # --- C. PDF Generation Function ---
-        def generate_pdf():
-            try:
-                # 1. Hide buttons for the screenshot
-                btn_print.place_forget()
-                btn_close.place_forget()
-                bill_win.update() # Force update to remove buttons visually
-
-                # 2. Capture Screenshot
-                x = bill_win.winfo_rootx()
-                y = bill_win.winfo_rooty()
-                w = bill_win.winfo_width()
-                h = bill_win.winfo_height()
-                
-                img = ImageGrab.grab(bbox=(x, y, x+w, y+h))
-                
-                # 3. Convert to RGB (Required for PDF)
-                img_rgb = img.convert('RGB')
-                
-                # 4. Save as PDF
-                # This saves "Invoice.pdf" in the same folder as your code
-                pdf_path = os.path.join(current_folder, "Invoice.pdf")
-                img_rgb.save(pdf_path)
-                
-                # 5. Restore buttons (Refresh the view)
-                draw_content()
-
-                # 6. Open the PDF
-                messagebox.showinfo("PDF Saved", f"PDF saved successfully!\nOpening: {pdf_path}")
-                os.startfile(pdf_path)
-
-            except Exception as e:
-                # Make sure buttons come back even if there is an error
-                draw_content()
-                messagebox.showerror("Error", f"Failed to make PDF: {e}")
-
-        # --- D. Amazon Style Buttons ---
-        btn_font = ("Arial", 11, "bold")
-        amazon_yellow = "#F7CA00" 
-        text_color    = "#0F1111"
-
-        btn_print = tk.Button(c, text="Print invoice", bg=amazon_yellow, fg=text_color, font=btn_font, relief="raised", cursor="hand2", command=generate_pdf)
-        btn_close = tk.Button(c, text="Close", bg="white", fg=text_color, font=btn_font, relief="solid", cursor="hand2", command=bill_win.destroy)
-
-        # Place Buttons
+        c.create_text(left_margin, h - 140, text="CEO & FOUNDER: Lanke venkateswarlu", font=("Arial", 8, "italic"), fill="#333333", anchor="w", tags="content")
+
+        # C. Place Buttons
         button_y = h - 60
         btn_width = 140
         gap_btn = 20
 
-        c.create_window(center_x - (btn_width/2) - (gap_btn/2), button_y, window=btn_print, width=btn_width, height=40)
-        c.create_window(center_x + (btn_width/2) + (gap_btn/2), button_y, window=btn_close, width=btn_width, height=40)
+        c.create_window(center_x - (btn_width/2) - (gap_btn/2), button_y, window=btn_print, width=btn_width, height=40, tags=("content", "buttons"))
+        c.create_window(center_x + (btn_width/2) + (gap_btn/2), button_y, window=btn_close, width=btn_width, height=40, tags=("content", "buttons"))
+
+    # --- 5. PDF Generation Function ---
+    def generate_pdf():
+        try:
+            # 1. Hide buttons for the screenshot
+            c.itemconfigure("buttons", state="hidden")
+            bill_win.update() # Force update to remove buttons visually
+
+            # 2. Capture Screenshot
+            x = bill_win.winfo_rootx()
+            y = bill_win.winfo_rooty()
+            w = bill_win.winfo_width()
+            h = bill_win.winfo_height()
+            
+            img = ImageGrab.grab(bbox=(x, y, x+w, y+h))
+            
+            # 3. Convert to RGB (Required for PDF)
+            img_rgb = img.convert('RGB')
+            
+            # 4. Save as PDF
+            # This saves "Invoice.pdf" in the same folder as your code
+            pdf_path = os.path.join(current_folder, "Invoice.pdf")
+            img_rgb.save(pdf_path)
+            
+            # 5. Restore buttons
+            c.itemconfigure("buttons", state="normal")
+
+            # 6. Open the PDF
+            messagebox.showinfo("PDF Saved", f"PDF saved successfully!\nOpening: {pdf_path}")
+            os.startfile(pdf_path)
+
+        except Exception as e:
+            # Make sure buttons come back even if there is an error
+            c.itemconfigure("buttons", state="normal")
+            messagebox.showerror("Error", f"Failed to make PDF: {e}")
+
+    # --- 6. Amazon Style Buttons (created once, placed by draw_content) ---
+    btn_font = ("Arial", 11, "bold")
+    amazon_yellow = "#F7CA00" 
+    text_color    = "#0F1111"
+
+    btn_print = tk.Button(c, text="Print invoice", bg=amazon_yellow, fg=text_color, font=btn_font, relief="raised", cursor="hand2", command=generate_pdf)
+    btn_close = tk.Button(c, text="Close", bg="white", fg=text_color, font=btn_font, relief="solid", cursor="hand2", command=bill_win.destroy)
 
-    # --- 5. Initial Draw & Bind ---
+    # --- 7. Initial Draw & Bind ---
     bill_win.after(100, draw_content)
-    c.bind("<Configure>", draw_content)
\ No newline at end of file
+    c.bind("<Configure>", draw_content)
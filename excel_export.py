@@ -0,0 +1,76 @@
+import csv
+import os
+import time
+
+from openpyxl import Workbook
+
+from ledger import COLUMN_LABELS
+from operations import iter_filtered
+
+# ================= STREAMING EXPORT =================
+# A view (the same filter dicts as the GUI buttons) is read off one cursor in
+# batches (operations.iter_filtered) and each batch goes straight to a csv
+# writer or an openpyxl write-only sheet, so memory stays flat however many
+# rows are exported. The file is written under a temporary name and renamed
+# when complete; a failed or abandoned export never leaves a partial file.
+EXPORT_TYPES = [("Excel Workbook", "*.xlsx"), ("CSV File", "*.csv")]
+PROGRESS_SECONDS = 0.25           # at most this often to progress()
+MAX_SHEET_ROWS = 1048576 - 1      # Excel's row limit, less the heading row
+
+def _write_csv(path, batches, on_batch):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMN_LABELS)
+        for rows in batches:
+            writer.writerows(rows)
+            on_batch(len(rows))
+
+def _write_xlsx(path, batches, on_batch):
+    wb = Workbook(write_only=True)
+    ws, sheet_rows, sheets = None, MAX_SHEET_ROWS, 0
+    for rows in batches:
+        for row in rows:
+            # Views beyond Excel's row limit continue on "Ledger 2", "Ledger 3", ...
+            if sheet_rows >= MAX_SHEET_ROWS:
+                sheets += 1
+                ws = wb.create_sheet("Ledger" if sheets == 1 else f"Ledger {sheets}")
+                ws.append(COLUMN_LABELS)
+                sheet_rows = 0
+            ws.append(row)
+            sheet_rows += 1
+        on_batch(len(rows))
+    if ws is None:
+        wb.create_sheet("Ledger").append(COLUMN_LABELS)
+    wb.save(path)
+
+WRITERS = {".csv": _write_csv, ".xlsx": _write_xlsx}
+
+def export_view(path, filters=None, progress=None, total=None):
+    """Write a view to path (.csv or .xlsx, by extension) in S.NO order. Returns the rows written.
+
+    progress(written, total) is called every PROGRESS_SECONDS and once at the
+    end; total is passed through (e.g. the footer's row count) and may be None.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Export to .csv or .xlsx, not {ext or 'a file without an extension'}")
+    written = 0
+    last_report = time.monotonic()
+
+    def on_batch(n):
+        nonlocal written, last_report
+        written += n
+        if progress and time.monotonic() - last_report >= PROGRESS_SECONDS:
+            last_report = time.monotonic()
+            progress(written, total)
+
+    tmp_path = path + ".part"
+    try:
+        WRITERS[ext](tmp_path, iter_filtered(filters), on_batch)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if progress:
+        progress(written, total)
+    return written
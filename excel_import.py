@@ -0,0 +1,171 @@
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from operations import to_iso_date
+
+# ================= STREAMING EXCEL IMPORT =================
+# Sheet rows are read in bounded chunks (openpyxl read-only mode) and each
+# chunk is cleaned with column operations, so memory stays flat and there is
+# no per-row Python work apart from building the final tuples.
+CHUNK_ROWS = 5000
+
+NUMERIC_COLUMNS = ["QUANTITY", "RATE", "ADVANCE"]
+TEXT_DEFAULTS = {"ITEM": "", "COUNT": "0", "PHONE": "", "LOCATION": "", "PAYMENT": "Incomplete"}
+KNOWN_COLUMNS = ["DATE", "CUSTOMER", *NUMERIC_COLUMNS, *TEXT_DEFAULTS]
+MAX_EXAMPLES = 10
+
+def _normalise_header(header):
+    return [str(c).upper().strip() if c is not None else "" for c in header]
+
+def _chunks_from_rows(rows, chunk_rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_sheet_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most chunk_rows sheet rows, with upper-cased column names."""
+    if file_path.lower().endswith(".xls"):
+        # openpyxl cannot stream legacy .xls files; fall back to a full read
+        df = pd.read_excel(file_path, dtype=object)
+        df.columns = _normalise_header(df.columns)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = _normalise_header(header)
+        for chunk in _chunks_from_rows(rows, chunk_rows):
+            yield pd.DataFrame(chunk, columns=header, dtype=object)
+    finally:
+        wb.close()
+
+def count_rows(file_path):
+    """Data rows in the first sheet (from the sheet dimensions, without reading the cells)."""
+    if file_path.lower().endswith(".xls"):
+        return len(pd.read_excel(file_path, usecols=[0]))
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        max_row = wb.active.max_row
+    finally:
+        wb.close()
+    return max(max_row - 1, 0) if max_row else 0
+
+def _text(series, default):
+    # Blank cells (None / NaN / whitespace) fall back to the default
+    s = series.astype(object).where(series.notna(), "")
+    s = s.map(str).str.strip()
+    return s.mask(s == "", default)
+
+def _column(df, name, default):
+    if name in df.columns:
+        return df[name]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+def drop_blank_customers(df):
+    customer = _text(_column(df, "CUSTOMER", ""), "")
+    return df[customer != ""]
+
+def prepare_chunk(df, start_sno, date_default, time_val):
+    """Turn one sheet chunk into accounts tuples (sno ... payment_status). Blank customers are dropped."""
+    customer = _text(_column(df, "CUSTOMER", ""), "")
+    df = df[customer != ""]
+    customer = customer[customer != ""]
+    n = len(df)
+    if n == 0:
+        return []
+
+    date = _text(_column(df, "DATE", date_default), date_default)
+    nums = {c: pd.to_numeric(_column(df, c, 0), errors="coerce").fillna(0.0).astype(float) for c in NUMERIC_COLUMNS}
+    total = nums["QUANTITY"] * nums["RATE"]
+    amount = (total - nums["ADVANCE"]).clip(lower=0.0)
+    text = {c: _text(_column(df, c, d), d) for c, d in TEXT_DEFAULTS.items()}
+
+    return list(zip(
+        range(start_sno, start_sno + n),
+        date.tolist(),
+        [time_val] * n,
+        customer.tolist(),
+        text["ITEM"].tolist(),
+        text["COUNT"].tolist(),
+        nums["QUANTITY"].tolist(),
+        nums["RATE"].tolist(),
+        total.tolist(),
+        nums["ADVANCE"].tolist(),
+        amount.tolist(),
+        text["PHONE"].tolist(),
+        text["LOCATION"].tolist(),
+        text["PAYMENT"].tolist(),
+    ))
+
+def iter_import_rows(file_path, allocate_snos, chunk_rows=CHUNK_ROWS):
+    """Yield ready-to-insert lists of tuples, one list per chunk.
+
+    allocate_snos(n) is called once per chunk with the number of usable rows and
+    returns the first S.NO of a reserved block (see operations.allocate_snos).
+    """
+    now = datetime.now()
+    date_default = now.strftime("%d-%m-%Y")
+    time_val = now.strftime("%H:%M:%S")
+    for df in iter_sheet_chunks(file_path, chunk_rows):
+        df = drop_blank_customers(df)
+        if len(df) == 0:
+            continue
+        yield prepare_chunk(df, allocate_snos(len(df)), date_default, time_val)
+
+def validate_import(file_path, chunk_rows=CHUNK_ROWS):
+    """Check a sheet without importing anything.
+
+    Returns counts of rows, usable rows (customer present), blank customers,
+    unreadable dates and non-numeric QUANTITY / RATE / ADVANCE cells, the
+    missing and unrecognised columns, and up to MAX_EXAMPLES example problems
+    with their sheet row numbers.
+    """
+    report = {"rows": 0, "usable": 0, "blank_customer": 0, "bad_date": 0, "bad_number": 0,
+              "missing_columns": [], "unknown_columns": [], "examples": []}
+
+    def example(sheet_row, message):
+        if len(report["examples"]) < MAX_EXAMPLES:
+            report["examples"].append(f"row {sheet_row}: {message}")
+
+    first_row = 2   # sheet row of the chunk's first data row (row 1 is the header)
+    for df in iter_sheet_chunks(file_path, chunk_rows):
+        if report["rows"] == 0:
+            columns = [c for c in df.columns if c]
+            report["missing_columns"] = [c for c in KNOWN_COLUMNS if c not in columns]
+            report["unknown_columns"] = [c for c in columns if c not in KNOWN_COLUMNS]
+        rows = [first_row + i for i in range(len(df))]
+        report["rows"] += len(df)
+        first_row += len(df)
+
+        blank = (_text(_column(df, "CUSTOMER", ""), "") == "").tolist()
+        report["blank_customer"] += sum(blank)
+        report["usable"] += len(blank) - sum(blank)
+        if "DATE" in df.columns:
+            for sheet_row, skip, value in zip(rows, blank, df["DATE"].tolist()):
+                if skip or value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == "":
+                    continue
+                if to_iso_date(value) is None:
+                    report["bad_date"] += 1
+                    example(sheet_row, f"DATE {value!r} is not a date")
+        for c in NUMERIC_COLUMNS:
+            if c not in df.columns:
+                continue
+            present = (_text(df[c], "") != "").tolist()
+            numeric = pd.to_numeric(df[c], errors="coerce").notna().tolist()
+            for sheet_row, skip, has, ok, value in zip(rows, blank, present, numeric, df[c].tolist()):
+                if not skip and has and not ok:
+                    report["bad_number"] += 1
+                    example(sheet_row, f"{c} {value!r} is not a number")
+    return report
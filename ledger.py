@@ -0,0 +1,80 @@
+import calendar
+from datetime import datetime
+
+# ================= LEDGER CORE =================
+# The non-UI rules main.py and the command line share: entry arithmetic,
+# turning form values into an accounts row, and the view filters behind the
+# GUI's buttons. Nothing here imports tkinter, pandas or openpyxl.
+FORM_FIELDS = ["DATE", "CUSTOMER", "ITEM", "COUNT", "QUANTITY", "RATE",
+               "ADVANCE PAID", "PHONE", "LOCATION", "PAYMENT"]
+MONTH_NAMES = list(calendar.month_name)[1:]
+# Headings for the 14 accounts columns (ROW_COLUMNS order), e.g. for exports
+COLUMN_LABELS = ["S.NO", "DATE", "TIME", "CUSTOMER", "ITEM", "COUNT", "QUANTITY", "RATE",
+                 "TOTAL", "ADVANCE PAID", "AMOUNT", "PHONE", "LOCATION", "PAYMENT"]
+
+def to_float(v):
+    try: return float(v)
+    except (ValueError, TypeError): return 0.0
+
+def calc_amounts(qty, rate, adv):
+    """(total, amount due) for an entry; the amount never goes below 0."""
+    total = qty * rate
+    amount = total - adv
+    if amount < 0: amount = 0.0
+    return total, amount
+
+def build_row(form, now=None):
+    """The 13 stored values (date ... payment_status, no S.NO) from form text keyed by FORM_FIELDS.
+
+    A blank DATE becomes today; TIME is always the moment of saving.
+    """
+    now = now or datetime.now()
+    date_val = str(form.get("DATE", "")).strip() or now.strftime("%d-%m-%Y")
+    qty = to_float(form.get("QUANTITY"))
+    rate = to_float(form.get("RATE"))
+    adv = to_float(form.get("ADVANCE PAID"))
+    total, amount = calc_amounts(qty, rate, adv)
+    return [
+        date_val, now.strftime("%H:%M:%S"),
+        form.get("CUSTOMER", ""), form.get("ITEM", ""),
+        str(form.get("COUNT", "")).strip(), qty, rate,
+        total, adv, amount,
+        form.get("PHONE", ""), form.get("LOCATION", ""), form.get("PAYMENT", ""),
+    ]
+
+# --- VIEW FILTERS (operations.filter_clause dicts) ---
+def month_filter(month, year):
+    """{"month": ("MM", "YYYY")} from a month name ("January") or number."""
+    month = str(month).strip()
+    if month.capitalize() in MONTH_NAMES:
+        number = MONTH_NAMES.index(month.capitalize()) + 1
+    elif month.isdigit() and 1 <= int(month) <= 12:
+        number = int(month)
+    else:
+        raise ValueError(f"Unknown month: {month}")
+    year = str(year).strip()
+    if not (year.isdigit() and len(year) == 4):
+        raise ValueError(f"Invalid year: {year}")
+    return {"month": (f"{number:02d}", year)}
+
+def parse_month(text):
+    """'01-2026', '1/2026', '2026-01' or 'January 2026' -> month_filter()."""
+    parts = text.replace("/", "-").replace(" ", "-").split("-")
+    if len(parts) != 2:
+        raise ValueError(f"Month must look like MM-YYYY: {text}")
+    if len(parts[0]) == 4 and parts[0].isdigit():
+        parts.reverse()
+    return month_filter(*parts)
+
+def view_filters(sno=None, customer=None, item=None, payment=None, search=None,
+                 month=None, date_from=None, date_to=None):
+    """Filter dict for a view; blank arguments are left out, so no arguments means the whole ledger."""
+    filters = {}
+    if sno not in (None, ""): filters["sno"] = int(sno)
+    for key, value in (("customer", customer), ("item", item), ("payment", payment), ("search", search),
+                       ("date_from", date_from), ("date_to", date_to)):
+        if value and str(value).strip():
+            filters[key] = str(value).strip()
+    if month:
+        filters.update(parse_month(month) if isinstance(month, str) else {"month": tuple(month)})
+    return filters
@@ -0,0 +1,62 @@
+import queue
+import threading
+from collections import defaultdict
+
+# ================= DEBOUNCED BACKGROUND LOOKUPS =================
+# Keystroke-driven lookups (suggestions, phone/location and rate auto-fill)
+# are debounced per key, run on one worker thread and handed back to Tk with
+# root.after, so the UI thread never waits on SQLite. Every new request for a
+# key bumps its generation: queued work that is already stale is skipped
+# before it runs, and results that arrive after a newer request are dropped.
+DEBOUNCE_MS = 120
+
+class LookupScheduler:
+    def __init__(self, root, delay_ms=DEBOUNCE_MS):
+        self.root = root
+        self.delay_ms = delay_ms
+        self._pending = {}                   # key -> Tk after() id of the debounce timer
+        self._generation = defaultdict(int)  # key -> latest request number
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="lookup-worker", daemon=True)
+        self._worker.start()
+
+    def schedule(self, key, func, callback, *args, delay_ms=None):
+        """Run func(*args) on the worker after the debounce delay; callback(result) runs on the Tk thread."""
+        self._generation[key] += 1
+        generation = self._generation[key]
+        self._cancel_timer(key)
+        delay = self.delay_ms if delay_ms is None else delay_ms
+        self._pending[key] = self.root.after(delay, self._submit, key, generation, func, args, callback)
+
+    def cancel(self, key):
+        self._generation[key] += 1
+        self._cancel_timer(key)
+
+    def _cancel_timer(self, key):
+        after_id = self._pending.pop(key, None)
+        if after_id is not None:
+            self.root.after_cancel(after_id)
+
+    def _submit(self, key, generation, func, args, callback):
+        self._pending.pop(key, None)
+        self._queue.put((key, generation, func, args, callback))
+
+    def _is_current(self, key, generation):
+        return self._generation[key] == generation
+
+    def _run(self):
+        while True:
+            key, generation, func, args, callback = self._queue.get()
+            if not self._is_current(key, generation):
+                continue
+            try:
+                result = func(*args)
+            except Exception as e:
+                print(f"Lookup failed ({key}): {e}")
+                continue
+            if self._is_current(key, generation):
+                self.root.after(0, self._deliver, key, generation, callback, result)
+
+    def _deliver(self, key, generation, callback, result):
+        if self._is_current(key, generation):
+            callback(result)
@@ -3,22 +3,32 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
 from tkinter import font
 import ctypes
-import sqlite3
 import calendar
-import shutil
 import os
-import pandas as pd
 import math
 import random
 import threading 
 
 # --- IMPORTS FROM YOUR FILES ---
 from operations import (
-    create_table, insert_record, update_record, delete_record,
-    fetch_all, fetch_by_sno, fetch_by_customer,
-    get_all_customer_names
+    DB_NAME, create_table, insert_record, insert_many, update_record, delete_record,
+    delete_many, restore_trash, purge_trash, settle_payments,
+    record_payment, get_balance, top_debtors, customer_statement,
+    fetch_page, fetch_by_sno, search,
+    fetch_by_payment, fetch_by_item, fetch_by_month, fetch_totals,
+    get_customer, get_customer_name_counts, get_item_name_counts, get_rate,
+    peek_next_sno, allocate_snos, claim_sno, add_write_hook, profile_scope,
+    enable_profiler, disable_profiler
 )
+from profiler import profiler
+from ledger import FORM_FIELDS, MONTH_NAMES, to_float, calc_amounts, build_row, month_filter
+from backup import BackupEngine
 from bill_view import show_bill
+from excel_import import count_rows, iter_import_rows
+from excel_export import EXPORT_TYPES, export_view
+from virtual_table import VirtualTreeview
+from suggestions import SuggestionIndex
+from lookup_scheduler import LookupScheduler
 
 # --- DPI AWARENESS ---
 try:
@@ -27,52 +37,22 @@ except Exception:
     pass
 
 # ================= DATABASE & SETUP =================
+# Query profiling is opt-in: set PRAWN_PROFILE=1 or tick it in DIAGNOSTICS
+if os.environ.get("PRAWN_PROFILE"):
+    enable_profiler()
+
 create_table()
+purge_trash()
 
-DB_FILE = "prawn_accounts.db" 
-found_files = [f for f in os.listdir('.') if f.endswith('.db') and "backup" not in f.lower()]
-if found_files:
-    DB_FILE = found_files[0]
-
-# ================= POWER FEATURES: BACKUP & SPEED =================
-def perform_safety_backup():
-    if not os.path.exists(DB_FILE): return
-    backup_dir = "Backups"
-    if not os.path.exists(backup_dir):
-        try: os.makedirs(backup_dir)
-        except OSError: return
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_name = f"{DB_FILE.split('.')[0]}_{timestamp}.db"
-    backup_path = os.path.join(backup_dir, backup_name)
-    
-    try:
-        shutil.copy2(DB_FILE, backup_path)
-        files = sorted([os.path.join(backup_dir, f) for f in os.listdir(backup_dir)], key=os.path.getmtime)
-        if len(files) > 10:
-            for f in files[:-10]: 
-                try: os.remove(f)
-                except: pass
-    except Exception as e:
-        print(f"Backup Warning: {e}")
+# Same file operations.py reads and writes (all access goes through its connection manager)
+DB_FILE = DB_NAME
 
-def optimize_database_speed():
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence'")
-        row = cur.fetchone()
-        if row:
-            tbl = row[0]
-            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_customer ON {tbl}(CUSTOMER)")
-            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_date ON {tbl}(DATE)")
-            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_item ON {tbl}(ITEM)")
-            conn.commit()
-        conn.close()
-    except Exception: pass 
-
-perform_safety_backup()
-optimize_database_speed()
+# ================= BACKUPS =================
+# Compressed online snapshots on a background thread: at startup if the ledger
+# changed since the last one, then every 30 minutes or 200 written rows
+backups = BackupEngine(DB_FILE)
+add_write_hook(backups.note_write)
+backups.start()
 
 # ================= GUI ROOT =================
 root = tk.Tk()
@@ -365,89 +345,93 @@ class DownloadAnimatedButton(tk.Canvas):
         self.itemconfigure(self.text_obj, state="normal")
 
 # ================= HELPERS & LOGIC =================
-def to_float(v):
-    try: return float(v)
-    except (ValueError, TypeError): return 0.0
-
 def clear_entries():
     for e in entries.values():
         e.config(state="normal")
         e.delete(0, tk.END)
 
-def update_footer(records_to_sum):
-    if not records_to_sum:
-        status_label.config(text="VIEWING: 0 rows")
-        return
-    qty_sum = 0.0
-    total_sum = 0.0
-    adv_sum = 0.0
-    amount_sum = 0.0
-    for r in records_to_sum:
-        try:
-            qty_sum += float(r[6])
-            total_sum += float(r[8])
-            adv_sum += float(r[9])
-            amount_sum += float(r[10])
-        except (ValueError, IndexError, TypeError): pass
-    status_text = (f"VIEWING: {len(records_to_sum)} rows  |  "
+current_view = {"filters": None, "heading": "VIEWING"}   # what the footer is summing
+
+def update_footer(filters=None, heading="VIEWING"):
+    # One aggregate query with the view's WHERE clause; operations keeps it
+    # cached and adjusts it on add/update/delete, so this is O(1) after edits
+    current_view.update(filters=filters, heading=heading)
+    count, qty_sum, total_sum, adv_sum, amount_sum = fetch_totals(filters)
+    status_text = (f"{heading}: {count} rows  |  "
                    f"TOTAL QTY: {qty_sum:.2f}  |  "
                    f"SUM TOTAL: {total_sum:,.2f}  |  "
                    f"SUM ADVANCE: {adv_sum:,.2f}  |  "
                    f"SUM AMOUNT: {amount_sum:,.2f}")
     status_label.config(text=status_text)
 
-def load_all():
-    tree.delete(*tree.get_children())
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    records = []
+# Rows stay as DB tuples in the table's backing store; these two are applied
+# only to the handful of rows that are actually on screen
+def display_row(r):
+    return tuple("" if v is None else v for v in r[:2] + r[3:]) # Remove TIME column
+
+def row_tag(r, i):
+    return "incomplete" if str(r[13]).lower() == "incomplete" else ("even" if i % 2 == 0 else "odd")
+
+def show_records(records, filters=None):
+    page_state["active"] = False
+    table.set_rows(records)
+    if records:
+        update_footer(filters)
+    else:
+        # Still the current view (e.g. for EXPORT VIEW), just an empty one
+        current_view.update(filters=filters, heading="VIEWING")
+        status_label.config(text="VIEWING: 0 rows")
+
+# --- PAGED MAIN VIEW (keyset pagination on S.NO) ---
+PAGE_SIZE = 100
+page_state = {"active": False, "first": None, "next": None}
+
+def show_page(after_sno=None, before_sno=None):
     try:
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence'")
-        table_row = cur.fetchone()
-        if table_row:
-            real_table_name = table_row[0]
-            try:
-                cur.execute(f"SELECT * FROM {real_table_name} ORDER BY SNO ASC LIMIT 100")
-            except Exception:
-                cur.execute(f"SELECT * FROM {real_table_name} LIMIT 100")
-            records = cur.fetchall()
+        records, next_cursor = fetch_page(after_sno, PAGE_SIZE, before_sno=before_sno)
     except Exception as e:
         print(f"Error loading: {e}")
-        records = []
-    finally:
-        conn.close()
+        return
+    if not records and page_state["active"]:
+        status_label.config(text="No more records")
+        return
+    show_records(records)
+    page_state.update(active=True, first=records[0][0] if records else None, next=next_cursor)
+    if records:
+        update_footer(None, heading=f"S.NO {records[0][0]} - {records[-1][0]} OF LEDGER")
 
-    if not records:
-        try:
-            records = fetch_all()
-            if records: records = records[:100]
-        except Exception: return
+def load_all():
+    page_state["active"] = False
+    show_page()
 
-    for i, r in enumerate(records):
-        r_list = list(r)
-        if len(r_list) > 2: del r_list[2] # Remove TIME column
-        tag = "even"
-        if len(r_list) >= 13:
-            tag = "incomplete" if r_list[12].lower() == "incomplete" else ("even" if i % 2 == 0 else "odd")
-        tree.insert("", "end", values=r_list, tags=(tag,))
-    
-    update_footer(records)
-    status_label.config(text=f"Displaying first {len(records)} records (Small to Big)")
+def next_page():
+    if not page_state["active"]:
+        load_all()
+    elif page_state["next"] is None:
+        status_label.config(text="Last page")
+    else:
+        show_page(after_sno=page_state["next"])
+
+def prev_page():
+    if not page_state["active"] or page_state["first"] is None:
+        load_all()
+    else:
+        show_page(before_sno=page_state["first"])
 
 def back_to_normal():
     clear_entries()
     entries["S.NO"].config(state="normal")
     entries["PAYMENT"].config(state="readonly")
+    balance_label.config(text="")
     load_all()
     status_label.config(text="Ready")
 
 def on_row_select(event):
-    selected_items = tree.selection()
-    if not selected_items:
+    selected_rows = table.selected_rows()
+    if not selected_rows:
         status_label.config(text="Ready")
         return
-    last_sel = selected_items[-1]
-    values = tree.item(last_sel, "values")
+    values = table.focused_row()
     mapping = {
         "S.NO":0, "DATE":1, 
         "CUSTOMER":2, "ITEM":3, "COUNT":4,
@@ -459,13 +443,13 @@ def on_row_select(event):
             entries[f].delete(0, tk.END)
             if idx < len(values): entries[f].insert(0, values[idx])
     entries["S.NO"].config(state="normal")
+    show_balance(values[2] if len(values) > 2 else "")
     qty_sum = 0.0
     total_sum = 0.0
     adv_sum = 0.0
     amount_sum = 0.0
-    num_selected = len(selected_items)
-    for item_id in selected_items:
-        r = tree.item(item_id, "values")
+    num_selected = len(selected_rows)
+    for r in selected_rows:
         try:
             qty_sum += float(r[5])
             total_sum += float(r[7])
@@ -481,54 +465,33 @@ def on_row_select(event):
 
 # --- SEARCH & FILTER FUNCTIONS ---
 def search_logic(func_name):
-    tree.delete(*tree.get_children())
     val = entries["CUSTOMER"].get() if func_name == "name" else entries["S.NO"].get()
     records = []
+    filters = None
     if func_name == "sno" and val.isdigit():
         r = fetch_by_sno(int(val))
         if r: records.append(r)
+        filters = {"sno": int(val)}
     elif func_name == "name":
-        records = fetch_by_customer(val)
-    for i, r in enumerate(records):
-        r_list = list(r)
-        if len(r_list) > 2: del r_list[2] # Remove Time
-        tag = "incomplete" if r_list[12].lower() == "incomplete" else ("even" if i % 2 == 0 else "odd")
-        tree.insert("", "end", values=r_list, tags=(tag,))
-    update_footer(records)
+        # FTS5 trigram index: ranked substring match on the customer name
+        records = search(val, fields=("customer_name",))
+        filters = {"customer": val}
+    show_records(records, filters)
 
+# Filtering happens in SQLite (indexed); the tree only receives matching rows
 def filter_by_payment():
-    tree.delete(*tree.get_children())
-    target_status = entries["PAYMENT"].get().strip().lower()
+    target_status = entries["PAYMENT"].get().strip()
     if not target_status:
         load_all()
         return
-    all_records = fetch_all()
-    filtered = []
-    if not all_records: return
-    for i, r in enumerate(all_records):
-        if r[13].lower() == target_status:
-            r_list = list(r)
-            if len(r_list) > 2: del r_list[2]
-            tag = "incomplete" if r[13].lower() == "incomplete" else ("even" if i % 2 == 0 else "odd")
-            tree.insert("", "end", values=r_list, tags=(tag,))
-    update_footer(filtered)
+    show_records(fetch_by_payment(target_status), {"payment": target_status})
 
 def filter_by_item():
-    tree.delete(*tree.get_children())
-    target_item = entries["ITEM"].get().strip().lower()
+    target_item = entries["ITEM"].get().strip()
     if not target_item:
         load_all()
         return
-    all_records = fetch_all()
-    filtered = []
-    if not all_records: return
-    for i, r in enumerate(all_records):
-        if target_item in r[4].lower():
-            r_list = list(r)
-            if len(r_list) > 2: del r_list[2]
-            tag = "incomplete" if r[13].lower() == "incomplete" else ("even" if i % 2 == 0 else "odd")
-            tree.insert("", "end", values=r_list, tags=(tag,))
-    update_footer(filtered)
+    show_records(fetch_by_item(target_item), {"item": target_item})
 
 def view_bill():
     sno = entries["S.NO"].get()
@@ -549,10 +512,9 @@ def open_month_picker():
     lbl.pack(pady=10)
     frame = tk.Frame(top, bg="white")
     frame.pack(pady=5)
-    month_names = list(calendar.month_name)[1:]
     cur_month_index = int(datetime.now().strftime("%m")) - 1
-    cur_month_name = month_names[cur_month_index]
-    cb_month = ttk.Combobox(frame, values=month_names, width=12, state="readonly", font=FONT_NORMAL)
+    cur_month_name = MONTH_NAMES[cur_month_index]
+    cb_month = ttk.Combobox(frame, values=MONTH_NAMES, width=12, state="readonly", font=FONT_NORMAL)
     cb_month.set(cur_month_name)
     cb_month.pack(side="left", padx=5)
     cur_year = int(datetime.now().strftime("%Y"))
@@ -561,23 +523,9 @@ def open_month_picker():
     cb_year.set(str(cur_year))
     cb_year.pack(side="left", padx=5)
     def apply_filter():
-        sel_name = cb_month.get()
-        sel_year = cb_year.get()
-        if sel_name in month_names:
-            m_num = str(month_names.index(sel_name) + 1).zfill(2)
-        else: return
-        target = f"-{m_num}-{sel_year}" 
-        tree.delete(*tree.get_children())
-        all_records = fetch_all()
-        filtered = []
-        if all_records:
-            for i, r in enumerate(all_records):
-                if target in r[1]: 
-                    r_list = list(r)
-                    if len(r_list) > 2: del r_list[2] # Remove Time
-                    tag = "incomplete" if r[13].lower() == "incomplete" else ("even" if i % 2 == 0 else "odd")
-                    tree.insert("", "end", values=r_list, tags=(tag,))
-        update_footer(filtered)
+        try: filters = month_filter(cb_month.get(), cb_year.get())
+        except ValueError: return
+        show_records(fetch_by_month(*filters["month"]), filters)
         top.destroy()
     btn = tk.Button(top, text="SHOW DATA", bg="#E91E63", fg="white", font=FONT_BOLD, command=apply_filter)
     btn.pack(pady=15, fill="x", padx=20)
@@ -589,54 +537,25 @@ def import_excel_data():
         return False 
 
     try:
-        df = pd.read_excel(file_path)
-        df.columns = [str(c).upper().strip() for c in df.columns]
-        
-        # Confirm Popup
-        num_records = len(df)
+        # Confirm Popup (row count comes from the sheet dimensions, no full read)
+        num_records = count_rows(file_path)
         file_name = os.path.basename(file_path)
         confirm = messagebox.askyesno("Confirm Import", f"File: {file_name}\n\nFound {num_records} records.\n\nImport them now?")
         
         if not confirm:
             return False
 
-        all_rows = fetch_all()
-        current_sno = (max([r[0] for r in all_rows]) + 1) if all_rows else 1
         success_count = 0
         
-        for index, row in df.iterrows():
-            # --- NEW LOGIC START ---
-            raw_cust = str(row.get("CUSTOMER", ""))
-            customer = raw_cust.strip() # Remove extra spaces
-            
-            # If name is empty after stripping, SKIP IT
-            if not customer: 
-                continue
-            # --- NEW LOGIC END ---
-
-            date_val = str(row.get("DATE", datetime.now().strftime("%d-%m-%Y")))
-            item = str(row.get("ITEM", ""))
-            
-            # (Note: we already checked customer above, so we don't need the old 'nan' check here)
-            
-            count_val = str(row.get("COUNT", "0"))
-            qty = to_float(row.get("QUANTITY", 0))
-            rate = to_float(row.get("RATE", 0))
-            adv = to_float(row.get("ADVANCE", 0))
-            phone = str(row.get("PHONE", ""))
-            location = str(row.get("LOCATION", ""))
-            payment = str(row.get("PAYMENT", "Incomplete"))
-            
-            total = qty * rate
-            amount = total - adv
-            if amount < 0: amount = 0.0
-            
-            time_val = datetime.now().strftime("%H:%M:%S")
-            
-            values = [current_sno, date_val, time_val, customer, item, count_val, qty, rate, total, adv, amount, phone, location, payment]
-            insert_record(values)
-            current_sno += 1
-            success_count += 1
+        # Sheet is streamed in chunks; blank customers are skipped and
+        # total/amount are computed per chunk inside excel_import. Each chunk
+        # reserves its S.NO block, so entries added meanwhile cannot collide.
+        # The import thread's connection uses the fast-import storage profile.
+        with profile_scope("fast-import"):
+            for rows in iter_import_rows(file_path, allocate_snos):
+                success_count += insert_many(rows)
+                customer_index.add_many(r[3] for r in rows)
+                item_index.add_many(r[4] for r in rows)
             
         root.after(0, load_all)
         root.after(0, lambda: messagebox.showinfo("Success", f"Successfully imported {success_count} records!"))
@@ -647,6 +566,42 @@ def import_excel_data():
         root.after(0, lambda: messagebox.showerror("Import Error", f"Failed to import excel:\n{err_msg}"))
         return False
 
+# --- EXPORT CURRENT VIEW ---
+# Streams whatever the footer is summing (whole ledger, month, item, payment
+# or search) to .xlsx / .csv on a worker thread; progress goes to the status bar
+export_state = {"running": False}
+
+def export_current_view():
+    if export_state["running"]:
+        messagebox.showinfo("Export", "An export is already running.")
+        return
+    filters = current_view["filters"]
+    heading = current_view["heading"] if filters else "WHOLE LEDGER"
+    total = fetch_totals(filters)[0]
+    path = filedialog.asksaveasfilename(title=f"Export {heading} ({total} rows)", defaultextension=".xlsx",
+                                        filetypes=EXPORT_TYPES,
+                                        initialfile=f"ledger_{datetime.now():%Y-%m-%d}.xlsx")
+    if not path:
+        return
+
+    def progress(written, total):
+        text = f"EXPORTING: {written:,} / {total:,} rows" if total else f"EXPORTING: {written:,} rows"
+        root.after(0, lambda: status_label.config(text=text))
+
+    def work():
+        try:
+            written = export_view(path, filters, progress, total)
+            root.after(0, lambda: status_label.config(text=f"Exported {written:,} rows to {os.path.basename(path)}"))
+        except Exception as e:
+            err_msg = str(e)
+            root.after(0, lambda: status_label.config(text="Export failed"))
+            root.after(0, lambda: messagebox.showerror("Export Error", f"Failed to export:\n{err_msg}"))
+        finally:
+            export_state["running"] = False
+
+    export_state["running"] = True
+    threading.Thread(target=work, name="export-worker", daemon=True).start()
+
 # ================= DATA ENTRY LOGIC =================
 def calculate_live(event):
     try:
@@ -656,47 +611,37 @@ def calculate_live(event):
         qty = float(q_val) if q_val else 0.0
         rate = float(r_val) if r_val else 0.0
         adv = float(a_val) if a_val else 0.0
-        total = qty * rate
-        amount = total - adv
-        if amount < 0: amount = 0.0
+        total, amount = calc_amounts(qty, rate, adv)
         entries["TOTAL"].delete(0, tk.END)
         entries["TOTAL"].insert(0, f"{total:.2f}")
         entries["AMOUNT"].delete(0, tk.END)
         entries["AMOUNT"].insert(0, f"{amount:.2f}")
     except ValueError: pass
 
+def form_values():
+    # Entry text keyed like ledger.FORM_FIELDS; ledger.build_row does the arithmetic
+    return {f: entries[f].get() for f in FORM_FIELDS}
+
 def add_data():
     sno_str = entries["S.NO"].get().strip()
-    if not sno_str:
-        try:
-            all_rows = fetch_all()
-            sno = (max([r[0] for r in all_rows]) + 1) if all_rows else 1
+    if not sno_str or sno_str == sno_preview["value"]:
+        # Blank or still the auto-filled preview: take a real reservation, which
+        # may be later than the preview if an import has claimed it meanwhile
+        try: sno = allocate_snos(1)
         except Exception: return
     else:
         sno = int(sno_str)
         if fetch_by_sno(sno):
             messagebox.showerror("Error", "Duplicate S.NO")
             return
+        try: claim_sno(sno)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
     try:
-        date_val = entries["DATE"].get().strip()
-        if not date_val: date_val = datetime.now().strftime("%d-%m-%Y")
-        time_val = datetime.now().strftime("%H:%M:%S")
-
-        qty = to_float(entries["QUANTITY"].get())
-        rate = to_float(entries["RATE"].get())
-        adv = to_float(entries["ADVANCE PAID"].get())
-        total = qty * rate
-        amount = total - adv
-        if amount < 0: amount = 0.0
-        count_val = entries["COUNT"].get().strip()
-        values = [
-            sno, date_val, time_val,
-            entries["CUSTOMER"].get(), entries["ITEM"].get(),
-            count_val, qty, rate,
-            total, adv, amount, 
-            entries["PHONE"].get(), entries["LOCATION"].get(), entries["PAYMENT"].get()
-        ]
+        values = [sno, *build_row(form_values())]
         insert_record(values)
+        index_names(values[3], values[4])
         load_all()
         clear_entries()
         entries["S.NO"].config(state="normal")
@@ -709,28 +654,12 @@ def update_data():
     if not sno.isdigit():
         messagebox.showerror("Error", "Select a record")
         return
-    date_val = entries["DATE"].get().strip()
-    if not date_val: date_val = datetime.now().strftime("%d-%m-%Y")
-    time_val = datetime.now().strftime("%H:%M:%S")
-
-    qty = to_float(entries["QUANTITY"].get())
-    rate = to_float(entries["RATE"].get())
-    adv = to_float(entries["ADVANCE PAID"].get())
-    total = qty * rate
-    amount = total - adv
-    if amount < 0: amount = 0.0
-    count_val = entries["COUNT"].get().strip()
-
-    values = [
-        date_val, time_val,
-        entries["CUSTOMER"].get(), entries["ITEM"].get(),
-        count_val, qty, rate,
-        total, adv, amount,
-        entries["PHONE"].get(), entries["LOCATION"].get(),
-        entries["PAYMENT"].get(), int(sno)
-    ]
+    values = [*build_row(form_values()), int(sno)]
     try:
+        old = fetch_by_sno(int(sno))
         update_record(values)
+        if old: index_names(old[3], old[4], -1)
+        index_names(values[2], values[3])
         load_all()
         clear_entries()
         entries["S.NO"].config(state="normal")
@@ -738,27 +667,29 @@ def update_data():
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
+last_delete = {"batch": None}   # trash batch of the most recent delete
+
 def delete_data():
     # 1. Check if rows are selected in the table (Highlighted)
-    selected_items = tree.selection()
+    selected_rows = table.selected_rows()
     
-    if selected_items:
+    if selected_rows:
         # --- MULTIPLE DELETE MODE ---
-        count = len(selected_items)
+        count = len(selected_rows)
         if not messagebox.askyesno("Confirm Selection", f"Are you sure you want to delete {count} selected records?"):
             return
         
         try:
-            for item_id in selected_items:
-                values = tree.item(item_id, "values")
-                if values:
-                    sno = int(values[0]) # Get S.NO from the first column
-                    delete_record(sno)   # Delete from database
+            # One transaction; the rows go to the trash and UNDO DELETE brings them back
+            batch_id, count = delete_many(int(values[0]) for values in selected_rows if values)
+            for values in selected_rows:
+                if values: index_names(values[2], values[3], -1)
+            last_delete["batch"] = batch_id
             
             load_all()     # Refresh table
             clear_entries() # Clear inputs
             entries["S.NO"].config(state="normal")
-            messagebox.showinfo("Success", f"Successfully deleted {count} records.")
+            messagebox.showinfo("Success", f"Successfully deleted {count} records.\n\nUse UNDO DELETE to restore them.")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete: {e}")
@@ -772,13 +703,226 @@ def delete_data():
             
         if messagebox.askyesno("Confirm", f"Delete S.NO {sno}?"):
             try:
-                delete_record(int(sno))
+                old = fetch_by_sno(int(sno))
+                last_delete["batch"] = delete_record(int(sno))
+                if old: index_names(old[3], old[4], -1)
                 load_all()
                 clear_entries()
                 entries["S.NO"].config(state="normal")
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
+def undo_delete():
+    batch_id = last_delete["batch"]
+    if batch_id is None:
+        messagebox.showinfo("Undo", "Nothing to undo.")
+        return
+    try:
+        rows = restore_trash(batch_id)
+        last_delete["batch"] = None
+        for r in rows: index_names(r[3], r[4])
+        load_all()
+        status_label.config(text=f"Restored {len(rows)} records")
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to restore: {e}")
+
+# --- BULK PAYMENT SETTLEMENT ---
+def open_settle_dialog():
+    selected = table.selected_rows()
+    top = tk.Toplevel(root)
+    top.title("Settle Payments")
+    top.configure(bg="white")
+    x = root.winfo_x() + (root.winfo_width() // 2) - 170
+    y = root.winfo_y() + (root.winfo_height() // 2) - 110
+    top.geometry(f"340x230+{x}+{y}")
+    tk.Label(top, text="Mark as Done (amount moves to advance)", font=FONT_BOLD, bg="white").pack(pady=10)
+
+    mode = tk.StringVar(value="selection" if selected else "range")
+    rb = tk.Radiobutton(top, text=f"Selected rows ({len(selected)})", variable=mode, value="selection", bg="white", font=FONT_NORMAL)
+    rb.pack(anchor="w", padx=20)
+    if not selected: rb.config(state="disabled")
+    tk.Radiobutton(top, text="Customer / date range", variable=mode, value="range", bg="white", font=FONT_NORMAL).pack(anchor="w", padx=20)
+
+    form = tk.Frame(top, bg="white")
+    form.pack(pady=5)
+    inputs = {}
+    for i, label in enumerate(["CUSTOMER", "FROM (dd-mm-yyyy)", "TO (dd-mm-yyyy)"]):
+        tk.Label(form, text=label, font=FONT_NORMAL, bg="white").grid(row=i, column=0, sticky="w", padx=5, pady=2)
+        e = tk.Entry(form, font=FONT_NORMAL, width=22)
+        e.grid(row=i, column=1, padx=5, pady=2)
+        inputs[label] = e
+    inputs["CUSTOMER"].insert(0, entries["CUSTOMER"].get().strip() or (selected[0][2] if selected else ""))
+
+    def apply_settlement():
+        try:
+            if mode.get() == "selection":
+                target = f"{len(selected)} selected rows"
+                kwargs = {"snos": [int(v[0]) for v in selected]}
+            else:
+                customer = inputs["CUSTOMER"].get().strip()
+                date_from = inputs["FROM (dd-mm-yyyy)"].get().strip()
+                date_to = inputs["TO (dd-mm-yyyy)"].get().strip()
+                if not (customer or date_from or date_to):
+                    messagebox.showerror("Error", "Enter a customer and/or a date range", parent=top)
+                    return
+                target = " ".join(filter(None, [customer, date_from and f"from {date_from}", date_to and f"to {date_to}"]))
+                kwargs = {"customer": customer, "date_from": date_from, "date_to": date_to}
+            if not messagebox.askyesno("Confirm", f"Settle all unpaid rows for {target}?", parent=top):
+                return
+            rows = settle_payments(**kwargs)
+        except Exception as e:
+            messagebox.showerror("Error", f"Settlement failed: {e}", parent=top)
+            return
+        top.destroy()
+        # Only the settled rows that are on screen change; the footer re-sums the current view
+        table.replace_rows(rows)
+        update_footer(current_view["filters"], current_view["heading"])
+        messagebox.showinfo("Success", f"Settled {len(rows)} records.")
+
+    tk.Button(top, text="SETTLE", bg="#4CAF50", fg="white", font=FONT_BOLD, command=apply_settlement).pack(pady=10, fill="x", padx=20)
+
+# --- CUSTOMER PAYMENTS & BALANCES ---
+def open_payment_dialog():
+    top = tk.Toplevel(root)
+    top.title("Receive Payment")
+    top.configure(bg="white")
+    x = root.winfo_x() + (root.winfo_width() // 2) - 170
+    y = root.winfo_y() + (root.winfo_height() // 2) - 120
+    top.geometry(f"340x250+{x}+{y}")
+    tk.Label(top, text="Record money received", font=FONT_BOLD, bg="white").pack(pady=10)
+
+    form = tk.Frame(top, bg="white")
+    form.pack(pady=5)
+    inputs = {}
+    for i, label in enumerate(["CUSTOMER", "AMOUNT", "DATE", "FOR S.NO (optional)", "NOTE"]):
+        tk.Label(form, text=label, font=FONT_NORMAL, bg="white").grid(row=i, column=0, sticky="w", padx=5, pady=2)
+        e = tk.Entry(form, font=FONT_NORMAL, width=22)
+        e.grid(row=i, column=1, padx=5, pady=2)
+        inputs[label] = e
+    inputs["CUSTOMER"].insert(0, entries["CUSTOMER"].get().strip())
+    inputs["DATE"].insert(0, datetime.now().strftime("%d-%m-%Y"))
+
+    def save_payment():
+        customer = inputs["CUSTOMER"].get().strip()
+        amount = to_float(inputs["AMOUNT"].get())
+        try:
+            record_payment(customer or None, amount, inputs["DATE"].get(),
+                           inputs["FOR S.NO (optional)"].get().strip() or None,
+                           inputs["NOTE"].get().strip() or None)
+        except Exception as e:
+            messagebox.showerror("Error", f"Payment not saved: {e}", parent=top)
+            return
+        top.destroy()
+        show_balance(customer or entries["CUSTOMER"].get())
+        status_label.config(text=f"Payment of {amount:,.2f} recorded")
+
+    tk.Button(top, text="SAVE PAYMENT", bg="#4CAF50", fg="white", font=FONT_BOLD, command=save_payment).pack(pady=10, fill="x", padx=20)
+
+def open_debtors():
+    top = tk.Toplevel(root)
+    top.title("Top Debtors")
+    top.geometry("760x560")
+    top.configure(bg="white")
+
+    debt_cols = ("CUSTOMER", "DUE", "PAID", "BALANCE", "LAST PAYMENT")
+    debtors = ttk.Treeview(top, columns=debt_cols, show="headings", height=12)
+    for c in debt_cols:
+        debtors.heading(c, text=c)
+        debtors.column(c, width=220 if c == "CUSTOMER" else 120, anchor="w" if c == "CUSTOMER" else "e")
+    debtors.pack(fill="both", expand=True, padx=10, pady=(10, 4))
+    for name, due, paid, balance, last_payment in top_debtors(100):
+        debtors.insert("", "end", values=(name, f"{due:,.2f}", f"{paid:,.2f}", f"{balance:,.2f}", last_payment or "-"))
+
+    tk.Label(top, text="Statement (double-click a customer)", font=FONT_BOLD, bg="white").pack(anchor="w", padx=10)
+    stmt_cols = ("DATE", "ENTRY", "REF", "AMOUNT", "RUNNING BALANCE")
+    statement = ttk.Treeview(top, columns=stmt_cols, show="headings", height=10)
+    for c in stmt_cols:
+        statement.heading(c, text=c)
+        statement.column(c, width=140, anchor="e" if c in ("AMOUNT", "RUNNING BALANCE") else "center")
+    statement.pack(fill="both", expand=True, padx=10, pady=(4, 10))
+
+    def show_statement(event=None):
+        sel = debtors.selection()
+        if not sel: return
+        statement.delete(*statement.get_children())
+        for date_val, kind, ref, amount, running in customer_statement(debtors.item(sel[0], "values")[0]):
+            statement.insert("", "end", values=(date_val, kind, ref, f"{amount:,.2f}", f"{running:,.2f}"))
+        children = statement.get_children()
+        if children: statement.see(children[-1])
+
+    debtors.bind("<Double-1>", show_statement)
+
+# --- QUERY DIAGNOSTICS ---
+def open_diagnostics():
+    top = tk.Toplevel(root)
+    top.title("Query Diagnostics")
+    top.geometry("1000x560")
+    top.configure(bg="white")
+
+    bar = tk.Frame(top, bg="white")
+    bar.pack(fill="x", padx=10, pady=8)
+    enabled = tk.BooleanVar(value=profiler.enabled)
+    slow_ms = tk.StringVar(value=f"{profiler.slow_ms:g}")
+
+    def toggle():
+        if enabled.get():
+            enable_profiler(to_float(slow_ms.get()) or None)
+        else:
+            disable_profiler()
+
+    tk.Checkbutton(bar, text="Profile queries", variable=enabled, command=toggle, bg="white", font=FONT_BOLD).pack(side="left")
+    tk.Label(bar, text="  EXPLAIN slower than (ms):", bg="white", font=FONT_NORMAL).pack(side="left")
+    tk.Entry(bar, textvariable=slow_ms, width=6, font=FONT_NORMAL).pack(side="left")
+
+    diag_cols = ("CALLS", "ROWS", "TOTAL ms", "P50 ms", "P95 ms", "MAX ms", "STATEMENT")
+    diag = ttk.Treeview(top, columns=diag_cols, show="headings", height=14)
+    for c in diag_cols:
+        diag.heading(c, text=c)
+        diag.column(c, width=620 if c == "STATEMENT" else 70, anchor="w" if c == "STATEMENT" else "e", stretch=c == "STATEMENT")
+    diag.pack(fill="both", expand=True, padx=10)
+    detail = tk.Text(top, height=8, font=("Consolas", 9), wrap="word")
+    detail.pack(fill="x", padx=10, pady=8)
+    report = []
+
+    def refresh():
+        report[:] = profiler.report()
+        diag.delete(*diag.get_children())
+        for i, r in enumerate(report):
+            diag.insert("", "end", iid=str(i), values=(r["calls"], r["rows"], f"{r['total_ms']:.1f}", f"{r['p50_ms']:.2f}",
+                                                        f"{r['p95_ms']:.2f}", f"{r['max_ms']:.2f}", r["sql"][:200]))
+
+    def show_detail(event=None):
+        sel = diag.selection()
+        if not sel: return
+        r = report[int(sel[0])]
+        plan = "\n".join(r["plan"]) if r["plan"] else "(not captured: never slower than the threshold)"
+        detail.delete("1.0", tk.END)
+        detail.insert(tk.END, f"{r['sql']}\n\nQUERY PLAN:\n{plan}")
+
+    def export():
+        path = filedialog.asksaveasfilename(parent=top, defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if path:
+            n = profiler.export(path)
+            messagebox.showinfo("Export", f"Saved {n} statements to {os.path.basename(path)}", parent=top)
+
+    def reset():
+        profiler.reset()
+        refresh()
+
+    for text, cmd in (("EXPORT", export), ("RESET", reset), ("REFRESH", refresh)):
+        tk.Button(bar, text=text, bg="#555555", fg="white", font=FONT_BOLD, relief="flat", command=cmd).pack(side="right", padx=4)
+    diag.bind("<<TreeviewSelect>>", show_detail)
+    refresh()
+
+def refresh_query_readout():
+    # Live "last query" time while profiling is on; blank otherwise
+    if profiler.enabled and profiler.last_ms is not None:
+        query_ms_label.config(text=f"last query {profiler.last_ms:.1f} ms")
+    else:
+        query_ms_label.config(text="")
+    root.after(500, refresh_query_readout)
+
 # ================= INPUT FORM FIELDS =================
 fields = [
     "S.NO", "DATE", "CUSTOMER", "ITEM", "COUNT", "QUANTITY", "RATE",
@@ -789,74 +933,88 @@ entries = {}
 suggestion_box = tk.Listbox(root, height=5, font=FONT_NORMAL, bg="#ffffe0")
 suggestion_box.place_forget()
 
-# --- AUTO-FILL HELPER FUNCTIONS ---
-def get_all_item_names_db():
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence'")
-        row = cur.fetchone()
-        if not row: return []
-        tbl = row[0]
-        cur.execute(f"SELECT DISTINCT ITEM FROM {tbl} WHERE ITEM IS NOT NULL AND ITEM != ''")
-        items = [r[0] for r in cur.fetchall()]
-        conn.close()
-        return items
-    except: return []
+# --- SUGGESTION INDEXES (built once; add/update/delete/import keep them current) ---
+customer_index = SuggestionIndex.from_counts(get_customer_name_counts())
+item_index = SuggestionIndex.from_counts(get_item_name_counts())
+
+def index_names(customer, item, sign=1):
+    if sign > 0:
+        customer_index.add(customer)
+        item_index.add(item)
+    else:
+        customer_index.remove(customer)
+        item_index.remove(item)
+
+# Lookups run on a worker thread (debounced); results come back via root.after
+lookups = LookupScheduler(root)
 
 # --- MODIFIED: Auto-Fill details now handles Phone AND Location ---
+def lookup_customer_details(name):
+    customer = get_customer(name)
+    if not customer: return None
+    return customer[1], customer[2] # Phone, Location
+
+def apply_customer_details(details):
+    if not details: return
+    phone, location = details
+    if phone and not entries["PHONE"].get().strip():
+        entries["PHONE"].delete(0, tk.END)
+        entries["PHONE"].insert(0, phone)
+    if location and not entries["LOCATION"].get().strip():
+        entries["LOCATION"].delete(0, tk.END)
+        entries["LOCATION"].insert(0, location)
+
 def auto_fill_details(name):
-    try:
-        records = fetch_by_customer(name)
-        if records:
-            last_record = records[-1]
-            
-            # Fill Phone (Index 11)
-            phone = last_record[11]
-            if phone and not entries["PHONE"].get().strip():
-                entries["PHONE"].delete(0, tk.END)
-                entries["PHONE"].insert(0, phone)
-            
-            # Fill Location (Index 12)
-            location = last_record[12]
-            if location and not entries["LOCATION"].get().strip():
-                entries["LOCATION"].delete(0, tk.END)
-                entries["LOCATION"].insert(0, location)
-    except Exception: pass
+    lookups.schedule("details", lookup_customer_details, apply_customer_details, name, delay_ms=0)
+    show_balance(name)
+
+# Outstanding balance of the customer in the form (customer_balances point read)
+def apply_balance(balance):
+    if not balance:
+        balance_label.config(text="")
+        return
+    name, due, paid, owed, last_payment = balance
+    balance_label.config(text=f"{name} OWES: {owed:,.2f}" if owed > 0 else f"{name}: NOTHING DUE",
+                         fg="#FF8A80" if owed > 0 else "#A5D6A7")
+
+def show_balance(name):
+    lookups.schedule("balance", get_balance, apply_balance, str(name), delay_ms=0)
+
+def apply_rate(rate_val):
+    if rate_val is not None:
+        entries["RATE"].delete(0, tk.END)
+        entries["RATE"].insert(0, str(rate_val))
+        calculate_live(None)
 
 def auto_fill_rate(item_name):
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence'")
-        row = cur.fetchone()
-        if not row: return
-        tbl = row[0]
-        cur.execute(f"SELECT RATE FROM {tbl} WHERE ITEM = ? ORDER BY SNO DESC LIMIT 1", (item_name,))
-        res = cur.fetchone()
-        conn.close()
-        if res:
-            rate_val = res[0]
-            entries["RATE"].delete(0, tk.END)
-            entries["RATE"].insert(0, str(rate_val))
-            calculate_live(None)
-    except: pass
+    # Rate as of the entry's date, so back-dated entries get that day's rate
+    date_val = entries["DATE"].get().strip()
+    lookups.schedule("rate", get_rate, apply_rate, item_name, date_val, delay_ms=0)
 
-def show_customer_suggestions(event):
-    entry = entries["CUSTOMER"]
-    typed = entry.get()
-    all_names = get_all_customer_names()
-    filtered = [n for n in all_names if typed.lower() in n.lower()]
-    if not filtered or typed.strip() == "":
+def place_suggestions(entry, names, on_select):
+    # Result of a background lookup: only show it if the user is still in that field
+    if not names or root.focus_get() is not entry:
         suggestion_box.place_forget()
         return
     suggestion_box.delete(0, tk.END)
-    for name in filtered: suggestion_box.insert(tk.END, name)
+    for name in names: suggestion_box.insert(tk.END, name)
     x = entry.winfo_rootx() - root.winfo_rootx()
     y = entry.winfo_rooty() - root.winfo_rooty() + entry.winfo_height()
     suggestion_box.place(x=x, y=y, width=entry.winfo_width())
     suggestion_box.lift()
-    suggestion_box.bind("<<ListboxSelect>>", fill_customer_suggestion)
+    suggestion_box.bind("<<ListboxSelect>>", on_select)
+
+def schedule_suggestions(entry, index, on_select):
+    typed = entry.get()
+    if typed.strip() == "":
+        lookups.cancel("suggest")
+        suggestion_box.place_forget()
+        return
+    # One key for both fields: they share the suggestion box
+    lookups.schedule("suggest", index.search, lambda names: place_suggestions(entry, names, on_select), typed)
+
+def show_customer_suggestions(event):
+    schedule_suggestions(entries["CUSTOMER"], customer_index, fill_customer_suggestion)
 
 def fill_customer_suggestion(event):
     sel = suggestion_box.curselection()
@@ -868,20 +1026,7 @@ def fill_customer_suggestion(event):
         auto_fill_details(name) # Changed call to new function name
 
 def show_item_suggestions(event):
-    entry = entries["ITEM"]
-    typed = entry.get()
-    all_items = get_all_item_names_db()
-    filtered = [n for n in all_items if typed.lower() in n.lower()]
-    if not filtered or typed.strip() == "":
-        suggestion_box.place_forget()
-        return
-    suggestion_box.delete(0, tk.END)
-    for name in filtered: suggestion_box.insert(tk.END, name)
-    x = entry.winfo_rootx() - root.winfo_rootx()
-    y = entry.winfo_rooty() - root.winfo_rooty() + entry.winfo_height()
-    suggestion_box.place(x=x, y=y, width=entry.winfo_width())
-    suggestion_box.lift()
-    suggestion_box.bind("<<ListboxSelect>>", fill_item_suggestion)
+    schedule_suggestions(entries["ITEM"], item_index, fill_item_suggestion)
 
 def fill_item_suggestion(event):
     sel = suggestion_box.curselection()
@@ -893,11 +1038,13 @@ def fill_item_suggestion(event):
         auto_fill_rate(item)
 
 def on_customer_focus_out(event):
+    lookups.cancel("suggest")
     root.after(200, lambda: suggestion_box.place_forget())
     name = entries["CUSTOMER"].get().strip()
     if name: auto_fill_details(name) # Changed call to new function name
 
 def on_item_focus_out(event):
+    lookups.cancel("suggest")
     root.after(200, lambda: suggestion_box.place_forget())
     item = entries["ITEM"].get().strip()
     if item: auto_fill_rate(item)
@@ -909,11 +1056,11 @@ def show_all_suggestions(field_name):
     
     if field_name == "CUSTOMER":
         entry = entries["CUSTOMER"]
-        items = get_all_customer_names()
+        items = customer_index.all_names()
         func = fill_customer_suggestion
     else:
         entry = entries["ITEM"]
-        items = get_all_item_names_db()
+        items = item_index.all_names()
         func = fill_item_suggestion
 
     if not items: return
@@ -926,13 +1073,16 @@ def show_all_suggestions(field_name):
     suggestion_box.bind("<<ListboxSelect>>", func)
     entry.focus_set()
 
+# The number auto_sno shows is only a preview; add_data allocates for real
+sno_preview = {"value": None}
+
 def auto_sno(event):
     if not entries["S.NO"].get():
         try:
-            all_rows = fetch_all()
-            next_no = (max([r[0] for r in all_rows]) + 1) if all_rows else 1
+            next_no = peek_next_sno()
             entries["S.NO"].delete(0, tk.END)
             entries["S.NO"].insert(0, str(next_no))
+            sno_preview["value"] = str(next_no)
         except Exception: pass
 
 # --- GENERATE FIELDS ---
@@ -1020,23 +1170,26 @@ cw = {"S.NO":60, "DATE":115, "CUSTOMER":300, "ITEM":145, "COUNT":110, "QUANTITY"
 frame = tk.Frame(root)
 frame.grid(row=5, column=0, columnspan=11, sticky="nsew")
 
-tree = ttk.Treeview(frame, columns=cols, show="headings", height=20, selectmode="extended")
+# Virtualized: only the rows in the viewport (+ overscan) exist as Treeview items
+table = VirtualTreeview(frame, cols, row_view=display_row, row_tag=row_tag, height=20)
+tree = table.tree
 tree.tag_configure("odd", background="white") 
 tree.tag_configure("even", background="#f2f2f2") 
 tree.tag_configure("incomplete", background="#ffcccc")
-tree.pack(fill="both", expand=True)
+table.pack(fill="both", expand=True)
 
 def calculate_column_sum(col_name):
-    selected_items = tree.selection()
+    col_idx = cols.index(col_name)
+    selected_rows = table.selected_rows()
     total = 0.0
-    if selected_items:
-        target_rows = selected_items
+    if selected_rows:
+        target_rows = selected_rows
         mode = "SELECTED"
     else:
-        target_rows = tree.get_children()
+        target_rows = table.iter_view_rows()
         mode = "ALL VISIBLE"
-    for child in target_rows:
-        val = tree.set(child, col_name)
+    for r in target_rows:
+        val = r[col_idx]
         try: total += float(val)
         except (ValueError, TypeError): pass
     messagebox.showinfo(f"Sum ({mode})", f"Sum of {col_name}:  {total:,.2f}")
@@ -1045,12 +1198,35 @@ for c in cols:
     tree.heading(c, text=c, anchor="center", command=lambda _c=c: calculate_column_sum(_c))
     tree.column(c, width=cw[c], anchor="center", stretch=False)
 
-tree.bind("<<TreeviewSelect>>", on_row_select)
+table.bind("<<SelectionChanged>>", on_row_select)
 
 status_frame = tk.Frame(root, bg="#333333", height=35)
 status_frame.grid(row=6, column=0, columnspan=11, sticky="ew")
 status_label = tk.Label(status_frame, text="Ready", bg="#333333", fg="white", font=FONT_FOOTER)
 status_label.pack(side="right", padx=20, pady=5)
+query_ms_label = tk.Label(status_frame, text="", bg="#333333", fg="#AAAAAA", font=FONT_NORMAL)
+query_ms_label.pack(side="right", pady=5)
+balance_label = tk.Label(status_frame, text="", bg="#333333", fg="#FF8A80", font=FONT_BOLD)
+balance_label.pack(side="right", padx=10, pady=5)
+
+tk.Button(status_frame, text="◀ PREV", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=prev_page).pack(side="left", padx=(20, 4), pady=5)
+tk.Button(status_frame, text="NEXT ▶", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=next_page).pack(side="left", padx=4, pady=5)
+tk.Button(status_frame, text="↶ UNDO DELETE", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=undo_delete).pack(side="left", padx=(16, 4), pady=5)
+tk.Button(status_frame, text="✔ SETTLE PAYMENTS", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=open_settle_dialog).pack(side="left", padx=4, pady=5)
+tk.Button(status_frame, text="₹ RECEIVE PAYMENT", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=open_payment_dialog).pack(side="left", padx=4, pady=5)
+tk.Button(status_frame, text="DEBTORS", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=open_debtors).pack(side="left", padx=4, pady=5)
+tk.Button(status_frame, text="⇩ EXPORT VIEW", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=export_current_view).pack(side="left", padx=4, pady=5)
+tk.Button(status_frame, text="DIAGNOSTICS", bg="#555555", fg="white", font=FONT_BOLD, relief="flat", cursor="hand2", command=open_diagnostics).pack(side="left", padx=4, pady=5)
+
+def on_close():
+    # Final snapshot of any writes made since the last one
+    status_label.config(text="Saving backup...")
+    root.update_idletasks()
+    backups.stop()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_close)
 
 load_all()
+refresh_query_readout()
 root.mainloop()
\ No newline at end of file
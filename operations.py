@@ -1,24 +1,739 @@
+import json
+import re
 import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from profiler import ProfiledConnection, profiler
 
 # --- RESTORED TO ORIGINAL NAME ---
 DB_NAME = "prawn_accounts.db"
 
+# ================= CONNECTION MANAGER =================
+# One long-lived connection per thread (GUI thread + import thread).
+# sqlite3 keeps a per-connection cache of prepared statements, so reusing
+# the same connection and the same SQL strings skips re-parsing every query.
+_local = threading.local()
+_stats_lock = threading.Lock()
+_connect_count = 0
+STATEMENT_CACHE_SIZE = 256
+
+# ================= STORAGE PROFILES =================
+# PRAGMAs applied to every connection get_connection() hands out.
+#  - WAL lets the GUI keep reading while the import thread writes, and a
+#    commit appends to the log instead of rewriting pages through a journal
+#  - "safe" fsyncs every commit (synchronous=FULL) for day-to-day entry
+#  - "fast-import" syncs only at checkpoints (synchronous=NORMAL: a power cut
+#    can lose the last commits but never corrupts the file) and uses a bigger
+#    page cache / memory map for bulk loads
+# cache_size < 0 is in KiB; mmap_size is bytes; busy_timeout is milliseconds.
+STORAGE_PROFILES = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "fast-import": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DEFAULT_PROFILE = "safe"
+_storage_profile = DEFAULT_PROFILE
+
+def apply_storage_profile(conn, name):
+    for pragma, value in STORAGE_PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+def _check_profile(name):
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {name}")
+
+def set_storage_profile(name):
+    """Switch every thread's connection to a named profile (re-applied on its next use)."""
+    global _storage_profile
+    _check_profile(name)
+    _storage_profile = name
+
+def storage_profile():
+    return getattr(_local, "override", None) or _storage_profile
+
+@contextmanager
+def profile_scope(name):
+    """Use a profile on this thread only, e.g. fast-import for the import thread."""
+    _check_profile(name)
+    previous = getattr(_local, "override", None)
+    _local.override = name
+    try:
+        yield
+    finally:
+        _local.override = previous
+
+def _open_connection(path, profiled=False):
+    global _connect_count
+    # isolation_level=None -> autocommit; transaction() issues BEGIN itself
+    factory = ProfiledConnection if profiled else sqlite3.Connection
+    conn = sqlite3.connect(path, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=factory)
+    with _stats_lock:
+        _connect_count += 1
+    return conn
+
 def get_connection():
-    return sqlite3.connect(DB_NAME)
+    conn = getattr(_local, "conn", None)
+    # Turning the profiler on/off swaps the connection class (outside transactions)
+    reprofile = conn is not None and _local.profiled != profiler.enabled and _local.depth == 0
+    if conn is None or getattr(_local, "path", None) != DB_NAME or reprofile:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(DB_NAME, profiler.enabled)
+        _local.conn = conn
+        _local.path = DB_NAME
+        _local.depth = 0
+        _local.profile = None
+        _local.profiled = profiler.enabled
+    wanted = storage_profile()
+    if _local.profile != wanted and _local.depth == 0:
+        # PRAGMAs like journal_mode cannot change inside a transaction
+        apply_storage_profile(conn, wanted)
+        _local.profile = wanted
+    return conn
 
-def create_table():
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+    _local.conn = None
+    _local.path = None
+    _local.depth = 0
+    _local.profile = None
+
+def connection_stats():
+    return {"connects": _connect_count}
+
+def enable_profiler(slow_ms=None):
+    """Time every statement from now on (see profiler.py); read results with profiler.report()."""
+    profiler.enable(slow_ms)
+
+def disable_profiler():
+    profiler.disable()
+
+@contextmanager
+def transaction():
+    """Yield a cursor inside BEGIN IMMEDIATE ... COMMIT; rolls back on error. Nested calls join the outer one.
+
+    Every transaction here writes, and most read first: taking the write lock
+    up front means a writer on another thread makes this one wait
+    (busy_timeout) instead of failing the read-to-write upgrade with
+    "database is locked".
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    
-    # Create table with correct 14 columns
+    if _local.depth > 0:
+        _local.depth += 1
+        try:
+            yield cursor
+        finally:
+            _local.depth -= 1
+        return
+    cursor.execute("BEGIN IMMEDIATE")
+    _local.depth = 1
+    try:
+        yield cursor
+    except BaseException:
+        _local.depth = 0
+        conn.rollback()
+        raise
+    else:
+        _local.depth = 0
+        conn.commit()
+
+def _query_all(sql, params=()):
+    cursor = get_connection().cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+def _query_one(sql, params=()):
+    cursor = get_connection().cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchone()
+
+# ================= DATES =================
+# The GUI stores dd-mm-YYYY text; Excel imports may also bring in
+# "YYYY-mm-dd HH:MM:SS" (date cells), dd/mm/YYYY or raw serial numbers.
+# date_iso keeps a sortable YYYY-mm-dd copy so month/range queries use an index.
+_DMY = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})")
+_YMD = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+_EXCEL_EPOCH = date(1899, 12, 30)
+
+def to_iso_date(value):
+    """Normalise a stored/imported date to 'YYYY-mm-dd', or None if it cannot be parsed."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    # Fast path for the calendar picker format
+    if len(text) == 10 and text[2] == "-" and text[5] == "-":
+        d, m, y = text[0:2], text[3:5], text[6:10]
+    else:
+        match = _DMY.match(text)
+        if match:
+            d, m, y = match.groups()
+        else:
+            match = _YMD.match(text)
+            if match:
+                y, m, d = match.groups()
+            else:
+                try:
+                    serial = float(text)
+                except ValueError:
+                    return None
+                if not 20000 <= serial < 80000:
+                    return None
+                return (_EXCEL_EPOCH + timedelta(days=int(serial))).isoformat()
+    try:
+        return date(int(y), int(m), int(d)).isoformat()
+    except ValueError:
+        return None
+
+# ================= SCHEMA =================
+def create_table():
+    with transaction() as cursor:
+        # Create table with correct 14 columns
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            sno INTEGER PRIMARY KEY,
+            date TEXT,
+            time TEXT,
+            customer_name TEXT,
+            item TEXT,
+            count INTEGER,
+            quantity REAL,
+            rate REAL,
+            total REAL,
+            advance_paid REAL,
+            amount REAL,
+            phone TEXT,
+            location TEXT,
+            payment_status TEXT,
+            date_iso TEXT
+        )
+        """)
+        _migrate_date_iso(cursor)
+        create_indexes(cursor)
+        create_search_index(cursor)
+        create_customers_table(cursor)
+        create_rate_book(cursor)
+        create_summaries(cursor)
+        create_payments(cursor)
+        create_trash_table(cursor)
+    invalidate_rates()
+
+def _migrate_date_iso(cursor):
+    # Older databases were created without date_iso: add it and backfill once
+    cursor.execute("PRAGMA table_info(accounts)")
+    if any(col[1] == "date_iso" for col in cursor.fetchall()):
+        return
+    cursor.execute("ALTER TABLE accounts ADD COLUMN date_iso TEXT")
+    cursor.execute("SELECT sno, date FROM accounts")
+    updates = [(to_iso_date(d), sno) for sno, d in cursor.fetchall()]
+    cursor.executemany("UPDATE accounts SET date_iso = ? WHERE sno = ?", updates)
+
+def create_indexes(cursor):
+    # NOCASE indexes serve the case-insensitive FILTER PAY / FILTER ITEM lookups;
+    # date_iso serves VIEW MONTH and date-range queries, and (item, date_iso)
+    # lets the rate book re-read one item's day when a row changes
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_accounts_customer ON accounts(customer_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_accounts_item_date ON accounts(item COLLATE NOCASE, date_iso)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_accounts_payment ON accounts(payment_status COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_accounts_date_iso ON accounts(date_iso)")
+
+# ================= FULL-TEXT SEARCH =================
+# accounts_fts is an external-content FTS5 table over accounts (no copy of the
+# text is stored) with the trigram tokenizer, so any 3+ character substring
+# of a customer, item, location or phone is an index lookup. Triggers keep it
+# in step with every insert / update / delete, except that insert_many lifts
+# the insert trigger and indexes each chunk with one INSERT ... SELECT (per-row
+# trigger inserts cost about 5x on bulk imports). Builds of SQLite without
+# FTS5 fall back to LIKE scans.
+SEARCH_FIELDS = ("customer_name", "item", "location", "phone")
+MIN_FTS_CHARS = 3
+_fts_ready = {}   # DB file -> bool
+
+_FTS_INSERT_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS accounts_fts_ai AFTER INSERT ON accounts BEGIN
+        INSERT INTO accounts_fts(rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.sno, {", ".join("new." + c for c in SEARCH_FIELDS)});
+    END"""
+
+def _insert_unindexed(cursor, rows):
+    # Bulk insert inside the caller's transaction with accounts_fts_ai dropped,
+    # then index the new rows in one statement. Other connections never see
+    # the trigger missing: the drop and re-create commit together.
+    if not _has_fts():
+        cursor.executemany(INSERT_SQL, map(_with_iso, rows))
+        return
+    cols = ", ".join(SEARCH_FIELDS)
+    cursor.execute("DROP TRIGGER IF EXISTS accounts_fts_ai")
+    cursor.executemany(INSERT_SQL, map(_with_iso, rows))
+    cursor.execute(
+        f"INSERT INTO accounts_fts(rowid, {cols}) SELECT sno, {cols} FROM accounts "
+        "WHERE sno IN (SELECT value FROM json_each(?))", (json.dumps([r[0] for r in rows]),))
+    cursor.execute(_FTS_INSERT_TRIGGER)
+
+def create_search_index(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'accounts_fts'")
+    exists = cursor.fetchone() is not None
+    if not exists:
+        try:
+            cursor.execute("""
+            CREATE VIRTUAL TABLE accounts_fts USING fts5(
+                customer_name, item, location, phone,
+                content = 'accounts', content_rowid = 'sno', tokenize = 'trigram'
+            )
+            """)
+        except sqlite3.OperationalError:
+            _fts_ready[DB_NAME] = False
+            return
+    cols = ", ".join(SEARCH_FIELDS)
+    new_cols = ", ".join("new." + c for c in SEARCH_FIELDS)
+    old_cols = ", ".join("old." + c for c in SEARCH_FIELDS)
+    cursor.execute(_FTS_INSERT_TRIGGER)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS accounts_fts_ad AFTER DELETE ON accounts BEGIN
+        INSERT INTO accounts_fts(accounts_fts, rowid, {cols}) VALUES ('delete', old.sno, {old_cols});
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS accounts_fts_au AFTER UPDATE OF {cols} ON accounts BEGIN
+        INSERT INTO accounts_fts(accounts_fts, rowid, {cols}) VALUES ('delete', old.sno, {old_cols});
+        INSERT INTO accounts_fts(rowid, {cols}) VALUES (new.sno, {new_cols});
+    END""")
+    if not exists:
+        # Index the rows that were already in the ledger
+        cursor.execute("INSERT INTO accounts_fts(accounts_fts) VALUES ('rebuild')")
+    _fts_ready[DB_NAME] = True
+
+def _has_fts():
+    if DB_NAME not in _fts_ready:
+        row = _query_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'accounts_fts'")
+        _fts_ready[DB_NAME] = row is not None
+    return _fts_ready[DB_NAME]
+
+def _fts_query(text, fields):
+    # Column filter + one quoted phrase, e.g.  {customer_name item} : "ramu"
+    phrase = '"' + text.replace('"', '""') + '"'
+    return "{" + " ".join(fields) + "} : " + phrase
+
+def _search_clause(text, fields):
+    """WHERE fragment + params matching rows whose `fields` contain `text` (case-insensitive)."""
+    text = text.strip()
+    if _has_fts() and len(text) >= MIN_FTS_CHARS:
+        return "sno IN (SELECT rowid FROM accounts_fts WHERE accounts_fts MATCH ?)", [_fts_query(text, fields)]
+    like = "%" + text + "%"
+    return "(" + " OR ".join(f"{f} LIKE ?" for f in fields) + ")", [like] * len(fields)
+
+# ================= CUSTOMERS =================
+# One row per customer (name is case-insensitive) with the latest non-blank
+# phone / location, last sale date and number of ledger rows. Triggers keep it
+# current for every write path, so auto-fill is a single primary-key read
+# instead of pulling the customer's whole history.
+def _customer_upsert(src, from_sql="", order_sql=""):
+    return f"""
+    INSERT INTO customers (name, phone, location, last_seen, last_sno, row_count)
+    SELECT trim({src}.customer_name), nullif(trim({src}.phone), ''), nullif(trim({src}.location), ''),
+           {src}.date_iso, {src}.sno, 1
+    {from_sql}
+    WHERE trim(coalesce({src}.customer_name, '')) != ''
+    {order_sql}
+    ON CONFLICT(name) DO UPDATE SET
+        phone = CASE WHEN excluded.phone IS NOT NULL
+                      AND (customers.phone IS NULL OR excluded.last_sno >= customers.last_sno)
+                     THEN excluded.phone ELSE customers.phone END,
+        location = CASE WHEN excluded.location IS NOT NULL
+                         AND (customers.location IS NULL OR excluded.last_sno >= customers.last_sno)
+                        THEN excluded.location ELSE customers.location END,
+        last_seen = CASE WHEN customers.last_seen IS NULL OR excluded.last_seen > customers.last_seen
+                         THEN excluded.last_seen ELSE customers.last_seen END,
+        last_sno = max(customers.last_sno, excluded.last_sno),
+        row_count = customers.row_count + 1
+    """
+
+def create_customers_table(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers'")
+    exists = cursor.fetchone() is not None
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS customers (
+        name TEXT PRIMARY KEY COLLATE NOCASE,
+        phone TEXT,
+        location TEXT,
+        last_seen TEXT,
+        last_sno INTEGER,
+        row_count INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS customers_ai AFTER INSERT ON accounts BEGIN
+        {_customer_upsert("new")};
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS customers_au AFTER UPDATE OF customer_name, phone, location, date_iso ON accounts BEGIN
+        UPDATE customers SET row_count = row_count - 1 WHERE name = trim(old.customer_name);
+        {_customer_upsert("new")};
+    END""")
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS customers_ad AFTER DELETE ON accounts BEGIN
+        UPDATE customers SET row_count = row_count - 1 WHERE name = trim(old.customer_name);
+    END""")
+    if not exists:
+        # Replay the existing ledger oldest-first through the same upsert
+        cursor.execute(_customer_upsert("a", "FROM accounts AS a", "ORDER BY a.sno"))
+
+def get_customer(name):
+    """(name, phone, location, last_seen, last_sno, row_count) for an exact (case-insensitive) name, or None."""
+    if not name or not name.strip():
+        return None
+    return _query_one(
+        "SELECT name, phone, location, last_seen, last_sno, row_count FROM customers WHERE name = ?",
+        (name.strip(),))
+
+# ================= RATE BOOK =================
+# item_rates holds one rate per (item, day): the rate of the latest S.NO sold
+# that day. Triggers keep it in step with accounts; rows without a parsable
+# date or with a zero rate are not rate evidence and are skipped. get_rate()
+# answers "what did this item cost on that day" with one primary-key seek and
+# keeps each item's current (latest-day) rate in memory.
+def _rate_upsert(src, from_sql="", order_sql=""):
+    return f"""
+    INSERT INTO item_rates (item, effective_date, rate, sno)
+    SELECT trim({src}.item), {src}.date_iso, CAST({src}.rate AS REAL), {src}.sno
+    {from_sql}
+    WHERE trim(coalesce({src}.item, '')) != '' AND {src}.date_iso IS NOT NULL
+      AND CAST({src}.rate AS REAL) > 0
+    {order_sql}
+    ON CONFLICT(item, effective_date) DO UPDATE SET rate = excluded.rate, sno = excluded.sno
+    WHERE excluded.sno >= item_rates.sno
+    """
+
+# The old row may have been the one setting its day's rate: drop that entry and
+# take the day's rate from the latest remaining row instead. item_rates keys are
+# stored trimmed; ledger items may carry stray spaces, so both sides are trimmed
+# there (the day's rows come from idx_accounts_date_iso)
+_RATE_REFRESH_OLD = """
+    DELETE FROM item_rates
+    WHERE item = trim(old.item) AND effective_date = old.date_iso AND sno = old.sno;
+    INSERT INTO item_rates (item, effective_date, rate, sno)
+    SELECT trim(item), date_iso, CAST(rate AS REAL), sno FROM accounts
+    WHERE trim(item) = trim(old.item) COLLATE NOCASE AND date_iso = old.date_iso AND CAST(rate AS REAL) > 0
+    ORDER BY sno DESC LIMIT 1
+    ON CONFLICT(item, effective_date) DO NOTHING;
+"""
+
+def create_rate_book(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_rates'")
+    exists = cursor.fetchone() is not None
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS item_rates (
+        item TEXT NOT NULL COLLATE NOCASE,
+        effective_date TEXT NOT NULL,
+        rate REAL NOT NULL,
+        sno INTEGER NOT NULL,
+        PRIMARY KEY (item, effective_date)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS item_rates_ai AFTER INSERT ON accounts BEGIN
+        {_rate_upsert("new")};
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS item_rates_au AFTER UPDATE OF item, rate, date_iso ON accounts BEGIN
+        {_RATE_REFRESH_OLD}
+        {_rate_upsert("new")};
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS item_rates_ad AFTER DELETE ON accounts BEGIN
+        {_RATE_REFRESH_OLD}
+    END""")
+    if not exists:
+        cursor.execute(_rate_upsert("a", "FROM accounts AS a", "ORDER BY a.sno"))
+
+_rates_lock = threading.Lock()
+_current_rates = {}      # lower-cased item -> (effective_date, rate) of its latest day
+_rates_generation = 0    # bumped on every write so a lookup racing a write is not cached
+
+def _current_rate(key):
+    with _rates_lock:
+        if key in _current_rates:
+            return _current_rates[key]
+        generation = _rates_generation
+    current = _query_one(
+        "SELECT effective_date, rate FROM item_rates WHERE item = ? ORDER BY effective_date DESC LIMIT 1",
+        (key,))
+    with _rates_lock:
+        if generation == _rates_generation:
+            _current_rates[key] = current
+    return current
+
+def get_rate(item, as_of_date=None):
+    """Rate of item on as_of_date (any format to_iso_date understands), or its current rate.
+
+    A date before the item's first sale gets the earliest known rate; an item
+    never sold returns None.
+    """
+    key = str(item or "").strip().lower()
+    if not key:
+        return None
+    current = _current_rate(key)
+    if current is None:
+        return None
+    as_of = to_iso_date(as_of_date) if as_of_date else None
+    if as_of is None or as_of >= current[0]:
+        return current[1]
+    row = _query_one(
+        "SELECT rate FROM item_rates WHERE item = ? AND effective_date <= ? "
+        "ORDER BY effective_date DESC LIMIT 1", (key, as_of))
+    if row is None:
+        row = _query_one(
+            "SELECT rate FROM item_rates WHERE item = ? ORDER BY effective_date LIMIT 1", (key,))
+    return row[0]
+
+def invalidate_rates(item=None):
+    global _rates_generation
+    with _rates_lock:
+        _rates_generation += 1
+        if item is None:
+            _current_rates.clear()
+        else:
+            _current_rates.pop(str(item).strip().lower(), None)
+
+# ================= SUMMARY TABLES =================
+# Row count and SUM quantity / total / advance_paid / amount per day, month,
+# customer-month and item-month, kept current by triggers on accounts (every
+# write path, including bulk imports, trash moves and settlements). Month and
+# date-range totals and the report breakdowns read these instead of scanning
+# the ledger. Undated rows are kept under the '' day / month; customer and
+# item keys are trimmed and case-insensitive, like the customers table.
+_MONTH_KEY = "substr(coalesce({src}.date_iso, ''), 1, 7)"
+SUMMARIES = {
+    "sales_by_day": {"day": "coalesce({src}.date_iso, '')"},
+    "sales_by_month": {"month": _MONTH_KEY},
+    "sales_by_customer_month": {"customer": "trim(coalesce({src}.customer_name, ''))", "month": _MONTH_KEY},
+    "sales_by_item_month": {"item": "trim(coalesce({src}.item, ''))", "month": _MONTH_KEY},
+}
+_NOCASE_KEYS = ("customer", "item")
+SUMMARY_MEASURES = "row_count, quantity, total, advance_paid, amount"
+
+def _summary_upsert(table, src, measures, from_sql=""):
+    keys = SUMMARIES[table]
+    cols = ", ".join(keys)
+    exprs = ", ".join(expr.format(src=src) for expr in keys.values())
+    group_sql = f"GROUP BY {exprs}" if from_sql else ""
+    return f"""
+    INSERT INTO {table} ({cols}, {SUMMARY_MEASURES})
+    SELECT {exprs}, {measures}
+    {from_sql}
+    {group_sql}
+    ON CONFLICT({cols}) DO UPDATE SET
+        row_count = row_count + excluded.row_count,
+        quantity = quantity + excluded.quantity,
+        total = total + excluded.total,
+        advance_paid = advance_paid + excluded.advance_paid,
+        amount = amount + excluded.amount
+    """
+
+def _summary_row(table, src, sign):
+    # One ledger row added to (sign 1) or taken off (sign -1) its group
+    numbers = ", ".join(f"{sign} * coalesce(CAST({src}.{col} AS REAL), 0)"
+                        for col in ("quantity", "total", "advance_paid", "amount"))
+    sql = _summary_upsert(table, src, f"{sign}, {numbers}") + ";"
+    if sign < 0:
+        keys = SUMMARIES[table]
+        match = " AND ".join(f"{col} = {expr.format(src=src)}" for col, expr in keys.items())
+        sql += f"\n    DELETE FROM {table} WHERE {match} AND row_count <= 0;"
+    return sql
+
+def _summary_rebuild(table):
+    return _summary_upsert(
+        table, "a", "COUNT(*), TOTAL(a.quantity), TOTAL(a.total), TOTAL(a.advance_paid), TOTAL(a.amount)",
+        "FROM accounts AS a")
+
+def create_summaries(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sales_by_%'")
+    existing = {row[0] for row in cursor.fetchall()}
+    for table, keys in SUMMARIES.items():
+        key_cols = ", ".join(f"{col} TEXT NOT NULL" + (" COLLATE NOCASE" if col in _NOCASE_KEYS else "")
+                             for col in keys)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {key_cols},
+            row_count INTEGER NOT NULL,
+            quantity REAL NOT NULL,
+            total REAL NOT NULL,
+            advance_paid REAL NOT NULL,
+            amount REAL NOT NULL,
+            PRIMARY KEY ({", ".join(keys)})
+        ) WITHOUT ROWID
+        """)
+        if table not in existing:
+            cursor.execute(_summary_rebuild(table))
+    add_new = "".join(_summary_row(table, "new", 1) for table in SUMMARIES)
+    take_old = "".join(_summary_row(table, "old", -1) for table in SUMMARIES)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS summaries_ai AFTER INSERT ON accounts BEGIN {add_new} END")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS summaries_au
+    AFTER UPDATE OF customer_name, item, quantity, total, advance_paid, amount, date_iso ON accounts BEGIN
+        {take_old}
+        {add_new}
+    END""")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS summaries_ad AFTER DELETE ON accounts BEGIN {take_old} END")
+
+def rebuild_summaries():
+    """Recompute every summary table and the customer balances from scratch. Returns {table: groups}."""
+    groups = {}
+    with transaction() as cursor:
+        for table in SUMMARIES:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(_summary_rebuild(table))
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            groups[table] = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM customer_balances")
+        _rebuild_balances(cursor)
+        cursor.execute("SELECT COUNT(*) FROM customer_balances")
+        groups["customer_balances"] = cursor.fetchone()[0]
+    invalidate_totals()
+    return groups
+
+# ================= WRITES =================
+# Rows handed to / returned from the GUI are always these 14 columns, in order
+ROW_COLUMNS = """sno, date, time, customer_name, item, count,
+    quantity, rate, total, advance_paid, amount,
+    phone, location, payment_status"""
+
+# date_iso is filled from the date value by the write helpers below
+INSERT_SQL = f"""
+INSERT INTO accounts (
+    {ROW_COLUMNS}, date_iso
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPDATE_SQL = """
+UPDATE accounts SET
+    date = ?,
+    time = ?,
+    customer_name = ?,
+    item = ?,
+    count = ?,
+    quantity = ?,
+    rate = ?,
+    total = ?,
+    advance_paid = ?,
+    amount = ?,
+    phone = ?,
+    location = ?,
+    payment_status = ?,
+    date_iso = ?
+WHERE sno = ?
+"""
+
+# Callbacks told how many rows each committed write touched (e.g. the backup engine)
+_write_hooks = []
+
+def add_write_hook(func):
+    _write_hooks.append(func)
+
+def _notify_write(rows=1):
+    for func in _write_hooks:
+        func(rows)
+
+def _with_iso(values):
+    return (*values, to_iso_date(values[1]))
+
+def insert_record(values):
+    try:
+        with transaction() as cursor:
+            cursor.execute(INSERT_SQL, _with_iso(values))
+            deltas = _totals_deltas(cursor, values[0], 1)
+    finally:
+        _release_snos(values[0])
+    _apply_totals(deltas)
+    invalidate_rates(values[4])
+    _notify_write()
+
+IMPORT_CHUNK_SIZE = 5000
+
+def insert_many(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Bulk insert with executemany; one transaction (one commit) per chunk. Returns rows inserted."""
+    rows = list(rows)
+    inserted = 0
+    try:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            with transaction() as cursor:
+                _insert_unindexed(cursor, chunk)
+            inserted += len(chunk)
+    finally:
+        # A bulk import touches too many rows for per-row deltas; recompute on
+        # next read -- also when a later chunk failed after earlier ones committed
+        invalidate_totals()
+        invalidate_rates()
+        if rows:
+            _release_snos(min(r[0] for r in rows), max(r[0] for r in rows))
+        if inserted:
+            _notify_write(inserted)
+    return inserted
+
+def update_record(values):
+    with transaction() as cursor:
+        sno = values[-1]
+        deltas = _totals_deltas(cursor, sno, -1)
+        # values = (date ... payment_status, sno); date_iso goes just before sno
+        cursor.execute(UPDATE_SQL, (*values[:-1], to_iso_date(values[0]), sno))
+        deltas += _totals_deltas(cursor, sno, 1)
+    _apply_totals(deltas)
+    invalidate_rates()
+    _notify_write()
+
+def delete_record(sno):
+    """Move one row to the trash; returns its trash batch id."""
+    with transaction() as cursor:
+        deltas = _totals_deltas(cursor, sno, -1)
+        batch_id = _next_batch(cursor)
+        _move_to_trash(cursor, [sno], batch_id)
+    _apply_totals(deltas)
+    invalidate_rates()
+    _notify_write()
+    return batch_id
+
+# ================= TRASH =================
+# Deleted rows are moved to accounts_trash (one batch per delete) instead of
+# being destroyed, so a mistaken delete can be restored. Batches older than
+# TRASH_KEEP_DAYS are purged at startup.
+TRASH_KEEP_DAYS = 30
+DELETE_CHUNK = 500   # S.NOs per IN (...) list, well under SQLite's host parameter limit
+
+def create_trash_table(cursor):
     cursor.execute("""
-    CREATE TABLE IF NOT EXISTS accounts (
-        sno INTEGER PRIMARY KEY,
+    CREATE TABLE IF NOT EXISTS accounts_trash (
+        trash_id INTEGER PRIMARY KEY,
+        batch_id INTEGER NOT NULL,
+        deleted_at TEXT NOT NULL,
+        sno INTEGER,
         date TEXT,
         time TEXT,
         customer_name TEXT,
         item TEXT,
-        count INTEGER,TEXT,
+        count INTEGER,
         quantity REAL,
         rate REAL,
         total REAL,
@@ -26,85 +741,683 @@ def create_table():
         amount REAL,
         phone TEXT,
         location TEXT,
-        payment_status TEXT
+        payment_status TEXT,
+        date_iso TEXT
     )
     """)
-    conn.commit()
-    conn.close()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trash_batch ON accounts_trash(batch_id)")
 
-def insert_record(values):
-    conn = get_connection()
-    cursor = conn.cursor()
-    sql = """
-    INSERT INTO accounts (
-        sno, date, time, customer_name, item, count, 
-        quantity, rate, total, advance_paid, amount, 
-        phone, location, payment_status
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+def _next_batch(cursor):
+    cursor.execute("SELECT COALESCE(MAX(batch_id), 0) + 1 FROM accounts_trash")
+    return cursor.fetchone()[0]
+
+def _move_to_trash(cursor, snos, batch_id):
+    deleted_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    moved = 0
+    for start in range(0, len(snos), DELETE_CHUNK):
+        chunk = snos[start:start + DELETE_CHUNK]
+        marks = ", ".join("?" * len(chunk))
+        cursor.execute(
+            f"INSERT INTO accounts_trash (batch_id, deleted_at, {ROW_COLUMNS}, date_iso) "
+            f"SELECT ?, ?, {ROW_COLUMNS}, date_iso FROM accounts WHERE sno IN ({marks})",
+            (batch_id, deleted_at, *chunk))
+        cursor.execute(f"DELETE FROM accounts WHERE sno IN ({marks})", chunk)
+        moved += cursor.rowcount
+    return moved
+
+def delete_many(snos):
+    """Move many rows to the trash in one transaction. Returns (batch_id, rows moved)."""
+    snos = sorted({int(s) for s in snos})
+    if not snos:
+        return None, 0
+    with transaction() as cursor:
+        batch_id = _next_batch(cursor)
+        moved = _move_to_trash(cursor, snos, batch_id)
+    # Too many rows for per-row deltas; cached totals are recomputed on next read
+    invalidate_totals()
+    invalidate_rates()
+    _notify_write(moved)
+    return batch_id, moved
+
+def list_trash():
+    """[(batch_id, deleted_at, rows, amount)], newest batch first."""
+    return _query_all(
+        "SELECT batch_id, MIN(deleted_at), COUNT(*), TOTAL(amount) FROM accounts_trash "
+        "GROUP BY batch_id ORDER BY batch_id DESC")
+
+def fetch_trash(batch_id):
+    return _query_all(
+        f"SELECT {ROW_COLUMNS} FROM accounts_trash WHERE batch_id = ? ORDER BY sno", (batch_id,))
+
+def restore_trash(batch_id):
+    """Put a trash batch back into the ledger; returns the restored rows.
+
+    Rows keep their S.NO unless it has been reused (or reserved) since the
+    delete, in which case they get a new one.
     """
-    cursor.execute(sql, values)
-    conn.commit()
-    conn.close()
+    restored, allocated = [], []
+    try:
+        with transaction() as cursor:
+            cursor.execute(
+                f"SELECT {ROW_COLUMNS}, date_iso FROM accounts_trash WHERE batch_id = ? ORDER BY sno",
+                (batch_id,))
+            rows = cursor.fetchall()
+            for sno, *rest in rows:
+                cursor.execute("SELECT 1 FROM accounts WHERE sno = ?", (sno,))
+                taken = cursor.fetchone()
+                with _sno_lock:
+                    held = _reserved_block(sno)
+                if taken or held:
+                    sno = allocate_snos()
+                    allocated.append(sno)
+                cursor.execute(INSERT_SQL, (sno, *rest))
+                restored.append((sno, *rest[:-1]))
+            cursor.execute("DELETE FROM accounts_trash WHERE batch_id = ?", (batch_id,))
+    finally:
+        for sno in allocated:
+            _release_snos(sno)
+    invalidate_totals()
+    invalidate_rates()
+    _notify_write(len(restored))
+    return restored
 
-def update_record(values):
-    conn = get_connection()
-    cursor = conn.cursor()
-    sql = """
-    UPDATE accounts SET
-        date = ?,
-        time = ?,
-        customer_name = ?,
-        item = ?,
-        count = ?,
-        quantity = ?,
-        rate = ?,
-        total = ?,
-        advance_paid = ?,
-        amount = ?,
-        phone = ?,
-        location = ?,
-        payment_status = ?
-    WHERE sno = ?
+def purge_trash(keep_days=TRASH_KEEP_DAYS):
+    """Permanently drop trash batches deleted more than keep_days ago. Returns rows purged."""
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d %H:%M:%S")
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM accounts_trash WHERE deleted_at < ?", (cutoff,))
+        return cursor.rowcount
+
+# ================= S.NO ALLOCATION =================
+# MAX(sno) on the INTEGER PRIMARY KEY is a single b-tree descent. Numbers handed
+# out but not inserted yet (an import chunk in flight on the import thread, or
+# an S.NO the GUI is about to add) are kept per database file as (first, last)
+# blocks until insert_record / insert_many release them, so the GUI thread and
+# the import thread never pick the same S.NO -- even once rows have been added
+# past a block an import still holds.
+_sno_lock = threading.Lock()
+_sno_reserved = {}   # DB file -> highest S.NO handed out by this process
+_sno_blocks = {}     # DB file -> [(first, last)] handed out, not released yet
+
+def _max_sno():
+    row = _query_one("SELECT MAX(sno) FROM accounts")
+    return row[0] or 0
+
+def _reserved_block(sno):
+    # The live (first, last) block holding sno, or None; call with _sno_lock held
+    for first, last in _sno_blocks.get(DB_NAME, ()):
+        if first <= sno <= last:
+            return first, last
+    return None
+
+def _release_snos(first, last=None):
+    """Drop the reservations overlapping first..last once those rows are written (or abandoned)."""
+    last = first if last is None else last
+    with _sno_lock:
+        blocks = _sno_blocks.get(DB_NAME)
+        if blocks:
+            blocks[:] = [b for b in blocks if b[1] < first or b[0] > last]
+
+def peek_next_sno():
+    """The S.NO the next allocation would return (nothing is reserved)."""
+    with _sno_lock:
+        return max(_max_sno(), _sno_reserved.get(DB_NAME, 0)) + 1
+
+def allocate_snos(count=1):
+    """Reserve `count` consecutive S.NOs and return the first one."""
+    with _sno_lock:
+        first = max(_max_sno(), _sno_reserved.get(DB_NAME, 0)) + 1
+        last = first + max(count, 1) - 1
+        _sno_reserved[DB_NAME] = last
+        _sno_blocks.setdefault(DB_NAME, []).append((first, last))
+    return first
+
+def claim_sno(sno):
+    """Mark a manually entered S.NO as taken so later allocations skip past it.
+
+    Raises ValueError if the number has already been handed out by
+    allocate_snos (e.g. to an import chunk) but not inserted yet.
     """
-    cursor.execute(sql, values)
-    conn.commit()
-    conn.close()
+    with _sno_lock:
+        block = _reserved_block(sno)
+        if block:
+            raise ValueError(f"S.NO {sno} is reserved by an import in progress (S.NO {block[0]}-{block[1]})")
+        _sno_blocks.setdefault(DB_NAME, []).append((sno, sno))
+        _sno_reserved[DB_NAME] = max(_sno_reserved.get(DB_NAME, 0), sno)
 
-def delete_record(sno):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM accounts WHERE sno = ?", (sno,))
-    conn.commit()
-    conn.close()
+# ================= PAYMENT SETTLEMENT =================
+SETTLED_STATUS = "Done"
+
+def settle_payments(snos=None, customer=None, date_from=None, date_to=None, status=SETTLED_STATUS):
+    """Mark the matching unsettled rows as paid in one transaction; returns the updated rows.
+
+    Rows are picked by a list of S.NOs, a customer name (any letter case) and/or
+    an inclusive date range -- at least one is required. The balance due is
+    moved into advance_paid and amount becomes 0.
+    """
+    clauses, params = [], []
+    if customer and customer.strip():
+        # Case and spacing variants of the name (as in customers / customer_balances)
+        # come from a covering scan of idx_accounts_customer; the rows themselves
+        # are then read through the same index
+        clauses.append("customer_name IN ("
+                       "SELECT DISTINCT customer_name FROM accounts WHERE trim(customer_name) = ? COLLATE NOCASE)")
+        params.append(customer.strip())
+    for value, op in ((date_from, ">="), (date_to, "<=")):
+        if value:
+            iso = to_iso_date(value)
+            if iso is None:
+                raise ValueError(f"Invalid date: {value}")
+            clauses.append(f"date_iso {op} ?")
+            params.append(iso)
+    if snos is not None:
+        snos = sorted({int(s) for s in snos})
+        if not snos:
+            return []
+    elif not clauses:
+        raise ValueError("Settlement needs S.NOs, a customer or a date range")
+    clauses.append("(coalesce(payment_status, '') != ? COLLATE NOCASE OR amount > 0)")
+    params.append(status)
+
+    # A blank advance or amount counts as 0, so advance_paid never becomes NULL
+    sql = ("UPDATE accounts SET payment_status = ?, "
+           "advance_paid = coalesce(advance_paid, 0) + coalesce(amount, 0), "
+           f"amount = 0 WHERE {' AND '.join(clauses)}")
+    chunks = [snos[i:i + DELETE_CHUNK] for i in range(0, len(snos), DELETE_CHUNK)] if snos else [None]
+    settled = []
+    with transaction() as cursor:
+        for chunk in chunks:
+            chunk_sql, chunk_params = sql, [status, *params]
+            if chunk is not None:
+                chunk_sql += f" AND sno IN ({', '.join('?' * len(chunk))})"
+                chunk_params += chunk
+            cursor.execute(f"{chunk_sql} RETURNING sno", chunk_params)
+            settled.extend(r[0] for r in cursor.fetchall())
+        # Re-read rather than RETURNING the columns, which skips REAL affinity (0 instead of 0.0)
+        settled.sort()
+        updated = []
+        for i in range(0, len(settled), DELETE_CHUNK):
+            chunk = settled[i:i + DELETE_CHUNK]
+            cursor.execute(f"SELECT {ROW_COLUMNS} FROM accounts WHERE sno IN ({', '.join('?' * len(chunk))}) "
+                           "ORDER BY sno", chunk)
+            updated.extend(cursor.fetchall())
+    if updated:
+        invalidate_totals()
+        _notify_write(len(updated))
+    return updated
+
+# ================= PAYMENTS & BALANCES =================
+# A payment received from a customer is its own row (customer, date, amount
+# and optionally the S.NO it pays towards) instead of an edit to the sale. A
+# customer's balance is the amount still due on their ledger rows less their
+# payments; customer_balances keeps due / paid / balance per customer through
+# triggers on both tables, so showing a balance is one primary-key read and
+# the top debtors come straight off the balance index. Settling a row (above)
+# still zeroes its amount -- record a payment or settle, not both.
+def _balance_upsert(customer, due, paid, last_payment="NULL", from_sql="", group_sql=""):
+    return f"""
+    INSERT INTO customer_balances (customer, due, paid, balance, last_payment)
+    SELECT trim({customer}), {due}, {paid}, ({due}) - ({paid}), {last_payment}
+    {from_sql}
+    WHERE trim(coalesce({customer}, '')) != ''
+    {group_sql}
+    ON CONFLICT(customer) DO UPDATE SET
+        due = due + excluded.due,
+        paid = paid + excluded.paid,
+        balance = balance + excluded.balance,
+        last_payment = CASE WHEN last_payment IS NULL OR excluded.last_payment > last_payment
+                            THEN excluded.last_payment ELSE last_payment END
+    """
+
+def _rebuild_balances(cursor):
+    cursor.execute(_balance_upsert("a.customer_name", "TOTAL(a.amount)", "0", from_sql="FROM accounts AS a",
+                                   group_sql="GROUP BY trim(a.customer_name)"))
+    cursor.execute(_balance_upsert("p.customer", "0", "TOTAL(p.amount)", "MAX(p.date_iso)",
+                                   from_sql="FROM payments AS p", group_sql="GROUP BY trim(p.customer)"))
+
+def create_payments(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customer_balances'")
+    exists = cursor.fetchone() is not None
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS payments (
+        payment_id INTEGER PRIMARY KEY,
+        customer TEXT NOT NULL COLLATE NOCASE,
+        date TEXT,
+        date_iso TEXT,
+        amount REAL NOT NULL,
+        sno INTEGER,
+        note TEXT
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_customer ON payments(customer, date_iso)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_sno ON payments(sno) WHERE sno IS NOT NULL")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS customer_balances (
+        customer TEXT PRIMARY KEY COLLATE NOCASE,
+        due REAL NOT NULL,
+        paid REAL NOT NULL,
+        balance REAL NOT NULL,
+        last_payment TEXT
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_balances_balance ON customer_balances(balance)")
+
+    amount = "coalesce(CAST({}.amount AS REAL), 0)"
+    add_sale = _balance_upsert("new.customer_name", amount.format("new"), "0")
+    take_sale = _balance_upsert("old.customer_name", "-" + amount.format("old"), "0")
+    add_payment = _balance_upsert("new.customer", "0", "new.amount", "new.date_iso")
+    # A removed payment may have been the latest one
+    take_payment = _balance_upsert("old.customer", "0", "-old.amount") + """;
+        UPDATE customer_balances SET last_payment = (
+            SELECT MAX(date_iso) FROM payments WHERE customer = trim(old.customer))
+        WHERE customer = trim(old.customer)"""
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS balances_ai AFTER INSERT ON accounts BEGIN {add_sale}; END")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS balances_au AFTER UPDATE OF customer_name, amount ON accounts BEGIN
+        {take_sale};
+        {add_sale};
+    END""")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS balances_ad AFTER DELETE ON accounts BEGIN {take_sale}; END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS payments_ai AFTER INSERT ON payments BEGIN {add_payment}; END")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS payments_au AFTER UPDATE OF customer, amount, date_iso ON payments BEGIN
+        {take_payment};
+        {add_payment};
+    END""")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS payments_ad AFTER DELETE ON payments BEGIN {take_payment}; END")
+    if not exists:
+        _rebuild_balances(cursor)
+
+def record_payment(customer=None, amount=0, date_val=None, sno=None, note=None):
+    """Record money received; returns the payment id.
+
+    With an S.NO the payment is allocated to that sale, and the customer
+    defaults to the sale's. The date defaults to today.
+    """
+    amount = float(amount)
+    if amount <= 0:
+        raise ValueError("Payment amount must be more than 0")
+    date_val = str(date_val).strip() if date_val else datetime.now().strftime("%d-%m-%Y")
+    iso = to_iso_date(date_val)
+    if iso is None:
+        raise ValueError(f"Invalid date: {date_val}")
+    with transaction() as cursor:
+        if sno not in (None, ""):
+            sno = int(sno)
+            cursor.execute("SELECT customer_name FROM accounts WHERE sno = ?", (sno,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"No ledger row with S.NO {sno}")
+            customer = customer or row[0]
+        else:
+            sno = None
+        if not customer or not customer.strip():
+            raise ValueError("A payment needs a customer or an S.NO")
+        cursor.execute(
+            "INSERT INTO payments (customer, date, date_iso, amount, sno, note) VALUES (?, ?, ?, ?, ?, ?)",
+            (customer.strip(), date_val, iso, amount, sno, note))
+        payment_id = cursor.lastrowid
+    _notify_write()
+    return payment_id
+
+def delete_payment(payment_id):
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM payments WHERE payment_id = ?", (payment_id,))
+        deleted = cursor.rowcount
+    if deleted:
+        _notify_write()
+    return deleted
+
+def fetch_payments(customer=None, sno=None):
+    """[(payment_id, customer, date, amount, sno, note)] for a customer and/or a sale, newest first."""
+    clauses, params = [], []
+    if customer and customer.strip():
+        clauses.append("customer = ?")
+        params.append(customer.strip())
+    if sno not in (None, ""):
+        clauses.append("sno = ?")
+        params.append(int(sno))
+    where_sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return _query_all(
+        f"SELECT payment_id, customer, date, amount, sno, note FROM payments{where_sql} "
+        "ORDER BY date_iso DESC, payment_id DESC", params)
+
+def get_balance(name):
+    """(customer, due, paid, balance, last_payment) for an exact (case-insensitive) name, or None."""
+    if not name or not name.strip():
+        return None
+    return _query_one(
+        "SELECT customer, due, paid, balance, last_payment FROM customer_balances WHERE customer = ?",
+        (name.strip(),))
+
+def top_debtors(limit=20):
+    """Customers owing the most: [(customer, due, paid, balance, last_payment)], largest balance first."""
+    return _query_all(
+        "SELECT customer, due, paid, balance, last_payment FROM customer_balances "
+        "WHERE balance > 0 ORDER BY balance DESC LIMIT ?", (limit,))
+
+def customer_statement(name):
+    """A customer's sales and payments, oldest first, with the running balance.
+
+    [(date, kind, ref, amount, balance)]: kind is "SALE" (ref = S.NO, amount =
+    amount due on it) or "PAYMENT" (ref = payment id, amount negative).
+    """
+    if not name or not name.strip():
+        return []
+    name = name.strip()
+    return _query_all("""
+    SELECT date, kind, ref, amount,
+           SUM(amount) OVER (ORDER BY date_iso, seq, ref ROWS UNBOUNDED PRECEDING)
+    FROM (
+        SELECT date, date_iso, 0 AS seq, 'SALE' AS kind, sno AS ref, coalesce(CAST(amount AS REAL), 0) AS amount
+        FROM accounts WHERE customer_name IN (
+            SELECT DISTINCT customer_name FROM accounts WHERE trim(customer_name) = ? COLLATE NOCASE)
+        UNION ALL
+        SELECT date, date_iso, 1, 'PAYMENT', payment_id, -amount FROM payments WHERE customer = ?
+    )
+    ORDER BY date_iso, seq, ref
+    """, (name, name))
 
+# ================= READS =================
 def fetch_all():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM accounts ORDER BY sno ASC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return _query_all(f"SELECT {ROW_COLUMNS} FROM accounts ORDER BY sno ASC")
 
 def fetch_by_sno(sno):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM accounts WHERE sno = ?", (sno,))
-    row = cursor.fetchone()
-    conn.close()
-    return row
+    return _query_one(f"SELECT {ROW_COLUMNS} FROM accounts WHERE sno = ?", (sno,))
 
 def fetch_by_customer(name):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM accounts WHERE customer_name LIKE ?", ('%' + name + '%',))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return fetch_filtered({"customer": name})
+
+# ================= VIEW FILTERS =================
+# A view filter is a dict built by the GUI, e.g. {"payment": "done"},
+# {"item": "kad"}, {"month": (1, 2026)}, {"customer": "swami"}, {"sno": 12},
+# {"search": "lanka"} (customer/item/location/phone) or
+# {"date_from": "01-01-2026", "date_to": "31-01-2026"}. The same WHERE clause
+# is reused by every query that works on "the current view".
+def _month_bounds(month, year):
+    prefix = f"{int(year):04d}-{int(month):02d}"
+    return prefix + "-01", prefix + "-31"
+
+def _row_search_clause(text, fields):
+    # The same case-insensitive substring test, evaluated on one row's own values
+    return "(" + " OR ".join(f"instr(lower({f}), lower(?)) > 0" for f in fields) + ")", [text.strip()] * len(fields)
+
+def filter_clause(filters, per_row=False):
+    """Return (where_sql, params) for a view filter dict; where_sql is '' when unfiltered.
+
+    per_row=True gives the same test without index subqueries (item IN ...,
+    FTS MATCH), for checking a single row already picked by its S.NO.
+    """
+    clauses, params = [], []
+    filters = filters or {}
+    if filters.get("sno") is not None:
+        clauses.append("sno = ?")
+        params.append(filters["sno"])
+    if filters.get("payment"):
+        clauses.append("payment_status = ? COLLATE NOCASE")
+        params.append(filters["payment"].strip())
+    if filters.get("item") and per_row:
+        clauses.append("instr(lower(item), lower(?)) > 0")
+        params.append(filters["item"].strip())
+    elif filters.get("item"):
+        # Substring match over the distinct item names (covering index scan);
+        # the matching rows are then read through idx_accounts_item_date
+        clauses.append("item COLLATE NOCASE IN ("
+                       "SELECT DISTINCT item FROM accounts WHERE instr(lower(item), lower(?)) > 0)")
+        params.append(filters["item"].strip())
+    search_clause = _row_search_clause if per_row else _search_clause
+    if filters.get("customer"):
+        clause, clause_params = search_clause(filters["customer"], ("customer_name",))
+        clauses.append(clause)
+        params.extend(clause_params)
+    if filters.get("search"):
+        clause, clause_params = search_clause(filters["search"], SEARCH_FIELDS)
+        clauses.append(clause)
+        params.extend(clause_params)
+    if filters.get("month"):
+        clauses.append("date_iso BETWEEN ? AND ?")
+        params.extend(_month_bounds(*filters["month"]))
+    if filters.get("date_from"):
+        clauses.append("date_iso >= ?")
+        params.append(to_iso_date(filters["date_from"]))
+    if filters.get("date_to"):
+        clauses.append("date_iso <= ?")
+        params.append(to_iso_date(filters["date_to"]))
+    where_sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where_sql, params
+
+def fetch_filtered(filters):
+    where_sql, params = filter_clause(filters)
+    return _query_all(f"SELECT {ROW_COLUMNS} FROM accounts{where_sql} ORDER BY sno ASC", params)
+
+STREAM_BATCH = 1000
+
+def iter_filtered(filters=None, batch_size=STREAM_BATCH):
+    """Yield the rows of a view in S.NO order, batch_size at a time, straight off one cursor.
+
+    Memory stays flat however large the view is; use it from a single thread
+    and finish (or close) the generator before writing through the same thread.
+    """
+    where_sql, params = filter_clause(filters)
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute(f"SELECT {ROW_COLUMNS} FROM accounts{where_sql} ORDER BY sno ASC", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+def fetch_by_payment(status):
+    return fetch_filtered({"payment": status})
+
+def fetch_by_item(text):
+    return fetch_filtered({"item": text})
+
+def fetch_by_month(month, year):
+    return fetch_filtered({"month": (month, year)})
+
+def search(text, fields=SEARCH_FIELDS, limit=None):
+    """Rows whose customer / item / location / phone contain `text`, best matches first."""
+    text = text.strip()
+    if not text:
+        return []
+    fields = tuple(fields)
+    limit = -1 if limit is None else limit
+    if _has_fts() and len(text) >= MIN_FTS_CHARS:
+        return _query_all(f"""
+            WITH hits AS (
+                SELECT rowid AS hit_sno, rank AS hit_rank FROM accounts_fts
+                WHERE accounts_fts MATCH ? ORDER BY rank LIMIT ?
+            )
+            SELECT {ROW_COLUMNS} FROM hits JOIN accounts ON accounts.sno = hits.hit_sno
+            ORDER BY hits.hit_rank, accounts.sno
+            """, (_fts_query(text, fields), limit))
+    clause, params = _search_clause(text, fields)
+    return _query_all(f"SELECT {ROW_COLUMNS} FROM accounts WHERE {clause} ORDER BY sno ASC LIMIT ?", [*params, limit])
+
+def fetch_page(after_sno=None, limit=100, filters=None, before_sno=None):
+    """Keyset pagination in S.NO order: returns (rows, next_cursor).
+
+    Pass next_cursor back as after_sno for the following page; it is None on the
+    last page. before_sno gives the page just before that S.NO (for "previous").
+    Both directions seek through the primary key, so the cost is O(limit) even
+    at the end of the ledger -- no OFFSET.
+    """
+    where_sql, params = filter_clause(filters)
+    if before_sno is not None:
+        keyset, order, cursor_val = "sno < ?", "DESC", before_sno
+    else:
+        keyset, order, cursor_val = "sno > ?", "ASC", (after_sno if after_sno is not None else -1)
+    where_sql = (where_sql + " AND " if where_sql else " WHERE ") + keyset
+    rows = _query_all(
+        f"SELECT {ROW_COLUMNS} FROM accounts{where_sql} ORDER BY sno {order} LIMIT ?",
+        [*params, cursor_val, limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before_sno is not None:
+        rows.reverse()
+        # Going backwards, the row at before_sno itself is always still ahead
+        has_more = bool(rows)
+    next_cursor = rows[-1][0] if rows and has_more else None
+    return rows, next_cursor
+
+# ================= VIEW TOTALS =================
+# Footer totals (rows, SUM quantity/total/advance_paid/amount) for a view are
+# one aggregate query over the same WHERE clause as the view, cached per view.
+# Single-row writes then adjust every cached view by the row's own numbers
+# (one primary-key lookup per cached view) instead of rescanning the ledger.
+# The whole ledger, a month and a date range are read from the summary tables.
+TOTALS_CACHE_SIZE = 8
+_totals_lock = threading.Lock()
+_totals_cache = OrderedDict()
+_totals_generation = 0   # bumped on every write so a query racing a write is not cached
+
+def _totals_key(filters):
+    return tuple(sorted((k, v) for k, v in (filters or {}).items() if v not in (None, "")))
+
+def _totals_sql(where_sql):
+    return ("SELECT COUNT(*), TOTAL(quantity), TOTAL(total), TOTAL(advance_paid), TOTAL(amount) "
+            f"FROM accounts{where_sql}")
+
+def fetch_totals(filters=None):
+    """[row_count, qty, total, advance_paid, amount] for the rows matching a view filter."""
+    key = _totals_key(filters)
+    with _totals_lock:
+        if key in _totals_cache:
+            _totals_cache.move_to_end(key)
+            return list(_totals_cache[key])
+        generation = _totals_generation
+    summary = _summary_query(filters)
+    if summary:
+        totals = list(_query_one(*summary))
+    else:
+        where_sql, params = filter_clause(filters)
+        totals = list(_query_one(_totals_sql(where_sql), params))
+    with _totals_lock:
+        if generation != _totals_generation:
+            return list(totals)
+        _totals_cache[key] = totals
+        while len(_totals_cache) > TOTALS_CACHE_SIZE:
+            _totals_cache.popitem(last=False)
+    return list(totals)
+
+def _totals_deltas(cursor, sno, sign):
+    # The row's contribution to each cached view (zeros where it does not match):
+    # one primary-key read per view, testing the view's filter on that row only
+    with _totals_lock:
+        keys = list(_totals_cache)
+    deltas = []
+    for key in keys:
+        where_sql, params = filter_clause(dict(key), per_row=True)
+        where_sql = " WHERE sno = ?" + (" AND " + where_sql[len(" WHERE "):] if where_sql else "")
+        cursor.execute(_totals_sql(where_sql), [sno, *params])
+        deltas.append((key, [sign * v for v in cursor.fetchone()]))
+    return deltas
+
+def _apply_totals(deltas):
+    # Applied only after the write has committed
+    global _totals_generation
+    with _totals_lock:
+        _totals_generation += 1
+        for key, delta in deltas:
+            if key in _totals_cache:
+                _totals_cache[key] = [a + b for a, b in zip(_totals_cache[key], delta)]
+
+def invalidate_totals():
+    global _totals_generation
+    with _totals_lock:
+        _totals_generation += 1
+        _totals_cache.clear()
+
+# Report breakdowns: group name -> SQL expression over accounts (blank keys are NULL;
+# customers and items group case-insensitively, as in the summary tables)
+GROUPS = {
+    "customer": "nullif(trim(customer_name), '') COLLATE NOCASE",
+    "item": "nullif(trim(item), '') COLLATE NOCASE",
+    "payment": "payment_status",
+    "day": "date_iso",
+    "month": "substr(date_iso, 1, 7)",
+}
+# ... and the summary table / key column that answers each group
+_SUMMARY_GROUPS = {
+    "customer": ("sales_by_customer_month", "customer"),
+    "item": ("sales_by_item_month", "item"),
+    "day": ("sales_by_day", "day"),
+    "month": ("sales_by_month", "month"),
+}
+_SUMMARY_SUMS = "coalesce(SUM(row_count), 0), TOTAL(quantity), TOTAL(total), TOTAL(advance_paid), TOTAL(amount)"
+
+def _summary_query(filters, group=None):
+    """(sql, params) answering a view's totals, or its breakdown by group, from the summary tables.
+
+    Only the whole ledger, a month or a date range qualify (other filters need
+    the rows themselves); returns None otherwise.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+    if group is not None and group not in _SUMMARY_GROUPS:
+        return None
+    if set(filters) <= {"month"}:
+        table, key = _SUMMARY_GROUPS[group or "month"]
+        clauses, params = [], []
+        if "month" in filters:
+            first, last = _month_bounds(*filters["month"])
+            if key == "day":
+                clauses.append("day BETWEEN ? AND ?")
+                params.extend((first, last))
+            else:
+                clauses.append("month = ?")
+                params.append(first[:7])
+    elif set(filters) <= {"date_from", "date_to"} and group in (None, "day", "month"):
+        table = "sales_by_day"
+        key = "substr(day, 1, 7)" if group == "month" else "day"
+        clauses, params = ["day != ''"], []
+        if "date_from" in filters:
+            clauses.append("day >= ?")
+            params.append(to_iso_date(filters["date_from"]))
+        if "date_to" in filters:
+            clauses.append("day <= ?")
+            params.append(to_iso_date(filters["date_to"]))
+    else:
+        return None
+    where_sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    if group is None:
+        return f"SELECT {_SUMMARY_SUMS} FROM {table}{where_sql}", params
+    return (f"SELECT nullif({key}, '') AS k, {_SUMMARY_SUMS} FROM {table}{where_sql} "
+            f"GROUP BY {key} ORDER BY k COLLATE NOCASE", params)
+
+def fetch_group_totals(group, filters=None):
+    """[(key, row_count, qty, total, advance_paid, amount)] per customer / item / payment / day / month."""
+    if group not in GROUPS:
+        raise ValueError(f"Unknown group: {group}")
+    summary = _summary_query(filters, group)
+    if summary:
+        return _query_all(*summary)
+    where_sql, params = filter_clause(filters)
+    expr = GROUPS[group]
+    return _query_all(
+        f"SELECT {expr} AS k, COUNT(*), TOTAL(quantity), TOTAL(total), TOTAL(advance_paid), TOTAL(amount) "
+        f"FROM accounts{where_sql} GROUP BY k ORDER BY k COLLATE NOCASE", params)
+
+def fetch_by_date_range(start, end):
+    """Rows dated start..end inclusive (date objects, dd-mm-YYYY or ISO strings), oldest first."""
+    where_sql, params = filter_clause({"date_from": start, "date_to": end})
+    return _query_all(f"SELECT {ROW_COLUMNS} FROM accounts{where_sql} ORDER BY date_iso ASC, sno ASC", params)
 
 def get_all_customer_names():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT customer_name FROM accounts ORDER BY customer_name ASC")
-    names = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return names
\ No newline at end of file
+    rows = _query_all("SELECT DISTINCT customer_name FROM accounts ORDER BY customer_name ASC")
+    return [row[0] for row in rows]
+
+def get_all_item_names():
+    rows = _query_all("SELECT DISTINCT item FROM accounts WHERE item IS NOT NULL AND item != ''")
+    return [row[0] for row in rows]
+
+def get_customer_name_counts():
+    return _query_all(
+        "SELECT customer_name, COUNT(*) FROM accounts "
+        "WHERE customer_name IS NOT NULL AND customer_name != '' GROUP BY customer_name")
+
+def get_item_name_counts():
+    return _query_all("SELECT item, COUNT(*) FROM accounts WHERE item IS NOT NULL AND item != '' GROUP BY item")
@@ -0,0 +1,178 @@
+import argparse
+import json
+import sys
+
+import operations
+from ledger import view_filters
+
+# ================= COMMAND LINE =================
+# Headless entry point for scheduled jobs on a machine without a display:
+#   python -m prawn_accounts import FILE [--check | --strict]
+#   python -m prawn_accounts export OUT.csv|OUT.xlsx [view filters]
+#   python -m prawn_accounts report [--by customer|item|payment|day|month] [view filters]
+#   python -m prawn_accounts backup snapshot|list|verify [FILE]|restore FILE|prune
+#   python -m prawn_accounts pay AMOUNT (--customer NAME | --sno N) [--date] [--note]
+#   python -m prawn_accounts debtors [--top N] [--json]
+#   python -m prawn_accounts rebuild-summaries
+# View filters: --month MM-YYYY, --customer, --item, --payment, --search,
+# --from / --to (dates), --sno. Only operations and ledger load up front;
+# pandas / openpyxl are imported by the commands that need them and tkinter
+# never is.
+
+def add_view_arguments(parser):
+    parser.add_argument("--month", help="MM-YYYY")
+    parser.add_argument("--customer")
+    parser.add_argument("--item")
+    parser.add_argument("--payment")
+    parser.add_argument("--search", help="substring of customer, item, location or phone")
+    parser.add_argument("--from", dest="date_from", help="first date (dd-mm-YYYY)")
+    parser.add_argument("--to", dest="date_to", help="last date (dd-mm-YYYY)")
+    parser.add_argument("--sno", type=int)
+
+def filters_from(args):
+    return view_filters(sno=args.sno, customer=args.customer, item=args.item, payment=args.payment,
+                        search=args.search, month=args.month, date_from=args.date_from, date_to=args.date_to)
+
+def cmd_import(args):
+    from excel_import import iter_import_rows, validate_import
+
+    report = validate_import(args.file)
+    print(f"{args.file}: {report['rows']} rows, {report['usable']} usable, "
+          f"{report['blank_customer']} without customer (skipped), "
+          f"{report['bad_date']} bad dates, {report['bad_number']} bad numbers")
+    if report["missing_columns"]:
+        print(f"  missing columns: {', '.join(report['missing_columns'])}")
+    if report["unknown_columns"]:
+        print(f"  ignored columns: {', '.join(report['unknown_columns'])}")
+    for line in report["examples"]:
+        print(f"  {line}")
+    problems = report["bad_date"] + report["bad_number"]
+    if args.check:
+        return 1 if problems or not report["usable"] else 0
+    if "CUSTOMER" in report["missing_columns"] or not report["usable"]:
+        print("nothing to import")
+        return 1
+    if args.strict and problems:
+        print("not imported (--strict)")
+        return 1
+
+    imported = 0
+    with operations.profile_scope("fast-import"):
+        for rows in iter_import_rows(args.file, operations.allocate_snos):
+            imported += operations.insert_many(rows)
+    print(f"imported {imported} rows")
+    return 0
+
+def cmd_export(args):
+    from excel_export import export_view
+
+    written = export_view(args.out, filters_from(args))
+    print(f"exported {written} rows to {args.out}")
+    return 0
+
+def cmd_report(args):
+    filters = filters_from(args)
+    count, qty, total, adv, amount = operations.fetch_totals(filters)
+    groups = operations.fetch_group_totals(args.by, filters) if args.by else []
+    if args.by:
+        groups = sorted(groups, key=lambda g: g[5], reverse=True) if args.sort == "amount" else groups
+        if args.top:
+            groups = groups[:args.top]
+    if args.json:
+        keys = ("rows", "quantity", "total", "advance_paid", "amount")
+        print(json.dumps({"filters": {k: list(v) if isinstance(v, tuple) else v for k, v in filters.items()},
+                          "totals": dict(zip(keys, (count, qty, total, adv, amount))),
+                          "groups": [{"key": g[0], **dict(zip(keys, g[1:]))} for g in groups]}, indent=2))
+        return 0
+    print(f"ROWS: {count}  |  QTY: {qty:.2f}  |  TOTAL: {total:,.2f}  |  "
+          f"ADVANCE: {adv:,.2f}  |  AMOUNT DUE: {amount:,.2f}")
+    if groups:
+        print(f"\n{args.by.upper():<30} {'ROWS':>8} {'QTY':>12} {'TOTAL':>15} {'ADVANCE':>15} {'AMOUNT':>15}")
+        for key, n, g_qty, g_total, g_adv, g_amount in groups:
+            print(f"{str(key if key not in (None, '') else '-')[:30]:<30} {n:>8} {g_qty:>12.2f} "
+                  f"{g_total:>15,.2f} {g_adv:>15,.2f} {g_amount:>15,.2f}")
+    return 0
+
+def cmd_pay(args):
+    payment_id = operations.record_payment(args.customer, args.amount, args.date, args.sno, args.note)
+    customer, due, paid, balance, _ = operations.get_balance(
+        args.customer or operations.fetch_by_sno(args.sno)[3])
+    print(f"payment {payment_id} recorded; {customer} balance {balance:,.2f}")
+    return 0
+
+def cmd_debtors(args):
+    debtors = operations.top_debtors(args.top)
+    if args.json:
+        keys = ("customer", "due", "paid", "balance", "last_payment")
+        print(json.dumps([dict(zip(keys, d)) for d in debtors], indent=2))
+        return 0
+    print(f"{'CUSTOMER':<30} {'DUE':>15} {'PAID':>15} {'BALANCE':>15}  LAST PAYMENT")
+    for customer, due, paid, balance, last_payment in debtors:
+        print(f"{customer[:30]:<30} {due:>15,.2f} {paid:>15,.2f} {balance:>15,.2f}  {last_payment or '-'}")
+    return 0
+
+def cmd_rebuild_summaries(args):
+    for table, groups in operations.rebuild_summaries().items():
+        print(f"{table}: {groups} groups")
+    return 0
+
+def cmd_backup(args):
+    import backup
+    return backup.main(["--db", operations.DB_NAME, *args.backup_args])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="prawn_accounts", description="Prawn Accounts without the GUI")
+    parser.add_argument("--db", default=operations.DB_NAME, help="ledger database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("import", help="import an Excel sheet (validated first)")
+    cmd.add_argument("file")
+    cmd.add_argument("--check", action="store_true", help="only validate; exit 1 on problems")
+    cmd.add_argument("--strict", action="store_true", help="do not import if any date or number is bad")
+    cmd.set_defaults(func=cmd_import)
+
+    cmd = commands.add_parser("export", help="write a view to CSV or XLSX (by extension)")
+    cmd.add_argument("out")
+    add_view_arguments(cmd)
+    cmd.set_defaults(func=cmd_export)
+
+    cmd = commands.add_parser("report", help="totals for a view, optionally broken down")
+    cmd.add_argument("--by", choices=sorted(operations.GROUPS))
+    cmd.add_argument("--sort", choices=["amount", "key"], default="amount")
+    cmd.add_argument("--top", type=int)
+    cmd.add_argument("--json", action="store_true")
+    add_view_arguments(cmd)
+    cmd.set_defaults(func=cmd_report)
+
+    cmd = commands.add_parser("pay", help="record money received from a customer")
+    cmd.add_argument("amount", type=float)
+    cmd.add_argument("--customer")
+    cmd.add_argument("--sno", type=int, help="sale the payment is for (customer defaults to its)")
+    cmd.add_argument("--date", help="dd-mm-YYYY (default today)")
+    cmd.add_argument("--note")
+    cmd.set_defaults(func=cmd_pay)
+
+    cmd = commands.add_parser("debtors", help="customers with the largest outstanding balance")
+    cmd.add_argument("--top", type=int, default=20)
+    cmd.add_argument("--json", action="store_true")
+    cmd.set_defaults(func=cmd_debtors)
+
+    cmd = commands.add_parser("rebuild-summaries", help="recompute the report totals and customer balances")
+    cmd.set_defaults(func=cmd_rebuild_summaries)
+
+    cmd = commands.add_parser("backup", help="snapshot | list | verify [FILE] | restore FILE | prune")
+    cmd.add_argument("backup_args", nargs=argparse.REMAINDER)
+    cmd.set_defaults(func=cmd_backup)
+
+    args = parser.parse_args(argv)
+    operations.DB_NAME = args.db
+    if args.command != "backup":
+        operations.create_table()
+    try:
+        return args.func(args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main())
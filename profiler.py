@@ -0,0 +1,201 @@
+import csv
+import json
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+
+# ================= QUERY PROFILER =================
+# Opt-in timing of every statement that goes through operations' connections.
+# While it is enabled, get_connection() opens connections with the classes
+# below; when it is off the plain sqlite3 classes are used, so there is no
+# overhead. A call's time covers execute() plus the fetches that read its
+# rows, and commits are timed as their own "COMMIT" entry. Statements slower
+# than slow_ms get their EXPLAIN QUERY PLAN captured (once per statement).
+SLOW_MS = 50.0
+SAMPLES_KEPT = 2000   # latencies kept per statement for the percentiles
+_NO_PLAN = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE", "DROP", "ALTER", "EXPLAIN")
+
+def normalise_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.samples = deque(maxlen=SAMPLES_KEPT)   # [ms] per call, grown by its fetches
+        self.plan = None
+
+    def summary(self):
+        times = sorted(sample[0] for sample in self.samples)
+        q = statistics.quantiles(times, n=20, method="inclusive") if len(times) > 1 else times * 19
+        return {"sql": self.sql, "calls": self.calls, "rows": self.rows,
+                "total_ms": round(self.total_ms, 3), "p50_ms": round(q[9], 3) if q else 0.0,
+                "p95_ms": round(q[18], 3) if q else 0.0, "max_ms": round(times[-1], 3) if times else 0.0,
+                "plan": self.plan}
+
+class QueryProfiler:
+    def __init__(self, slow_ms=SLOW_MS):
+        self.enabled = False
+        self.slow_ms = slow_ms
+        self.last_ms = None       # duration of the most recent call, for the live readout
+        self.last_sql = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def enable(self, slow_ms=None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.last_ms = self.last_sql = None
+
+    def _stat(self, sql):
+        key = normalise_sql(sql)
+        stat = self._stats.get(key)
+        if stat is None:
+            stat = self._stats[key] = StatementStats(key)
+        return stat
+
+    def record(self, sql, ms, rows=0):
+        """Start a call's sample; returns a handle that add() extends with fetch time and rows."""
+        with self._lock:
+            stat = self._stat(sql)
+            stat.calls += 1
+            stat.rows += rows
+            stat.total_ms += ms
+            sample = [ms]
+            stat.samples.append(sample)
+            self.last_ms, self.last_sql = ms, stat.sql
+            return stat, sample
+
+    def add(self, handle, ms, rows):
+        stat, sample = handle
+        with self._lock:
+            stat.rows += rows
+            stat.total_ms += ms
+            sample[0] += ms
+            self.last_ms = sample[0]
+        return sample[0]
+
+    def needs_plan(self, handle, total_ms):
+        stat = handle[0]
+        return (total_ms >= self.slow_ms and stat.plan is None
+                and not stat.sql.upper().startswith(_NO_PLAN))
+
+    def set_plan(self, handle, plan):
+        handle[0].plan = plan
+
+    def report(self):
+        """Per-statement summaries, most total time first."""
+        with self._lock:
+            stats = list(self._stats.values())
+            summaries = [s.summary() for s in stats]
+        return sorted(summaries, key=lambda s: s["total_ms"], reverse=True)
+
+    def export(self, path):
+        report = self.report()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(report[0]) if report else ["sql"])
+                writer.writeheader()
+                for row in report:
+                    writer.writerow({**row, "plan": " | ".join(row["plan"] or [])})
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"slow_ms": self.slow_ms, "statements": report}, f, indent=2)
+        return len(report)
+
+profiler = QueryProfiler()
+
+class ProfiledCursor(sqlite3.Cursor):
+    _handle = None
+    _sql = _params = None
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            rows = self.rowcount if self.description is None and self.rowcount > 0 else 0
+            self._sql, self._params = sql, parameters
+            self._handle = profiler.record(sql, ms, rows)
+            self._check_slow(ms)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self._handle = profiler.record(sql, ms, max(self.rowcount, 0))
+            self._sql = None   # no single parameter set to EXPLAIN with
+
+    def _timed_fetch(self, fetch, *args):
+        t0 = time.perf_counter()
+        result = fetch(*args)
+        if self._handle is not None:
+            ms = (time.perf_counter() - t0) * 1000
+            if result is None:
+                rows = 0
+            elif isinstance(result, list):
+                rows = len(result)
+            else:
+                rows = 1
+            self._check_slow(profiler.add(self._handle, ms, rows))
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def __next__(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+
+    def _check_slow(self, total_ms):
+        if self._sql is None or not profiler.needs_plan(self._handle, total_ms):
+            return
+        try:
+            # A plain cursor, so the EXPLAIN itself is not profiled
+            plan = sqlite3.Cursor(self.connection).execute(
+                "EXPLAIN QUERY PLAN " + self._sql, self._params).fetchall()
+            profiler.set_plan(self._handle, [row[-1] for row in plan])
+        except sqlite3.Error as e:
+            profiler.set_plan(self._handle, [f"(no plan: {e})"])
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts would otherwise use a plain cursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            profiler.record("COMMIT", (time.perf_counter() - t0) * 1000)
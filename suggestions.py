@@ -0,0 +1,105 @@
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+# ================= AUTOCOMPLETE INDEX =================
+# Built once from the DB and then kept current by the GUI's add / update /
+# delete / import paths, so a keystroke never touches SQLite.
+#  - prefix matches: bisect into a sorted list of (token, name), where the
+#    tokens are the lower-cased full name and every word start inside it
+#  - infix matches (3+ chars): intersect trigram posting sets
+# Results are ranked prefix > word-start > infix, then by how many ledger
+# rows use the name, then alphabetically.
+NGRAM = 3
+DEFAULT_LIMIT = 20
+PREFIX_SCAN = 200
+
+def _word_starts(lower):
+    starts = [0]
+    for i in range(1, len(lower)):
+        if lower[i - 1] == " " and lower[i] != " ":
+            starts.append(i)
+    return starts
+
+class SuggestionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}                # name -> number of rows using it
+        self._tokens = []                # sorted (token, name)
+        self._grams = defaultdict(set)   # trigram -> names containing it
+
+    @classmethod
+    def from_counts(cls, name_counts):
+        # Bulk build: collect every token first and sort once
+        index = cls()
+        for name, count in name_counts:
+            if not name or not str(name).strip():
+                continue
+            name = str(name)
+            if name not in index._counts:
+                index._index_name(name, index._tokens.extend)
+                index._counts[name] = 0
+            index._counts[name] += count
+        index._tokens.sort()
+        return index
+
+    def _index_name(self, name, add_tokens=None):
+        lower = name.lower()
+        tokens = [(lower[start:], name) for start in _word_starts(lower)]
+        if add_tokens:
+            add_tokens(tokens)
+        else:
+            for token in tokens:
+                insort(self._tokens, token)
+        for i in range(len(lower) - NGRAM + 1):
+            self._grams[lower[i:i + NGRAM]].add(name)
+
+    def add(self, name, count=1):
+        if not name or not str(name).strip():
+            return
+        name = str(name)
+        with self._lock:
+            if name not in self._counts:
+                self._index_name(name)
+                self._counts[name] = 0
+            self._counts[name] += count
+
+    def add_many(self, names):
+        for name in names:
+            self.add(name)
+
+    def remove(self, name, count=1):
+        # Names are only hidden (count 0), so re-adding them later is cheap
+        with self._lock:
+            if name in self._counts:
+                self._counts[name] = max(0, self._counts[name] - count)
+
+    def all_names(self):
+        with self._lock:
+            return sorted(n for n, c in self._counts.items() if c > 0)
+
+    def search(self, typed, limit=DEFAULT_LIMIT):
+        q = typed.strip().lower()
+        if not q:
+            return []
+        with self._lock:
+            counts = self._counts
+            rank = {}   # name -> 0 (prefix), 1 (word start), 2 (infix)
+            pos = bisect_left(self._tokens, (q,))
+            end = min(pos + PREFIX_SCAN, len(self._tokens))
+            while pos < end and self._tokens[pos][0].startswith(q):
+                token, name = self._tokens[pos]
+                if counts[name] > 0:
+                    r = 0 if token == name.lower() else 1
+                    if r < rank.get(name, 3):
+                        rank[name] = r
+                pos += 1
+            if len(rank) < limit and len(q) >= NGRAM:
+                grams = [self._grams.get(q[i:i + NGRAM], set()) for i in range(len(q) - NGRAM + 1)]
+                grams.sort(key=len)
+                candidates = set(grams[0]).intersection(*grams[1:]) if grams[0] else set()
+                for name in candidates:
+                    if name not in rank and counts[name] > 0 and q in name.lower():
+                        rank[name] = 2
+            ranked = sorted(rank, key=lambda n: (rank[n], -counts[n], n))
+        return ranked[:limit]
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import operations
+
+
+def make_row(sno, amount, advance=None):
+    return [sno, "01-01-2026", "10:00", "Ramu", "Scampi", "1", "1", "100", "100",
+            advance, amount, "", "", "Pending"]
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(operations, "DB_NAME", str(tmp_path / "ledger.db"))
+    operations.create_table()
+    yield
+    operations.close_connection()
+
+
+def test_settle_null_amount_keeps_advance(ledger):
+    operations.insert_record(make_row(1, None, advance=40))
+    operations.insert_record(make_row(2, 60, advance=40))
+    operations.insert_record(make_row(3, None))
+
+    settled = operations.settle_payments(customer="ramu")
+
+    # (sno, advance_paid, amount, payment_status)
+    assert [(r[0], r[9], r[10], r[13]) for r in settled] == [
+        (1, 40, 0, "Done"),
+        (2, 100, 0, "Done"),
+        (3, 0, 0, "Done"),
+    ]
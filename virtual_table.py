@@ -0,0 +1,195 @@
+import tkinter as tk
+from tkinter import ttk
+
+# ================= VIRTUAL-SCROLLING TABLE =================
+# The full result set stays in a plain list of DB tuples (the backing store);
+# the Treeview only ever holds a small pool of items -- the rows in the
+# viewport plus a little overscan -- which are re-filled as the user scrolls.
+# Selection is tracked by row index in the backing store, so it survives the
+# pool items being recycled.
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
+class VirtualTreeview(tk.Frame):
+    def __init__(self, parent, columns, row_view=None, row_tag=None, overscan=2, **tree_options):
+        super().__init__(parent)
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended", **tree_options)
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.vsb.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.row_view = row_view or (lambda r: r)
+        self.row_tag = row_tag or (lambda r, i: "even" if i % 2 == 0 else "odd")
+        self.overscan = overscan
+
+        self.rows = []           # backing store (raw DB tuples)
+        self.offset = 0          # index of the first row in the viewport
+        self.visible = int(tree_options.get("height", 20))
+        self.selected = set()    # selected row indices
+        self.cursor = None       # last clicked / keyboard row index
+        self.anchor = None       # start of a shift-click range
+        self.pool = []           # Treeview item ids currently materialized
+
+        self.tree.bind("<Configure>", self.on_configure)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<Up>", lambda e: self.move_cursor(-1, e))
+        self.tree.bind("<Down>", lambda e: self.move_cursor(1, e))
+        self.tree.bind("<Prior>", lambda e: self.move_cursor(-self.visible, e))
+        self.tree.bind("<Next>", lambda e: self.move_cursor(self.visible, e))
+        self.tree.bind("<Home>", lambda e: self.move_cursor(-len(self.rows), e))
+        self.tree.bind("<End>", lambda e: self.move_cursor(len(self.rows), e))
+        self.tree.bind("<Control-a>", self.select_all)
+
+    # --- DATA ---
+    def set_rows(self, rows):
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self.offset = 0
+        self.selected.clear()
+        self.cursor = self.anchor = None
+        self.render()
+
+    def replace_rows(self, rows, key=lambda r: r[0]):
+        """Swap in updated versions of rows already in the view (matched by key); selection is kept."""
+        updated = {key(r): r for r in rows}
+        if not updated:
+            return 0
+        replaced = 0
+        for i, r in enumerate(self.rows):
+            new = updated.get(key(r))
+            if new is not None:
+                self.rows[i] = new
+                replaced += 1
+        if replaced:
+            self.render()
+        return replaced
+
+    def __len__(self):
+        return len(self.rows)
+
+    def iter_view_rows(self):
+        """All rows of the result set in display form (not just the materialized ones)."""
+        return (self.row_view(r) for r in self.rows)
+
+    def selected_rows(self):
+        return [self.row_view(self.rows[i]) for i in sorted(self.selected)]
+
+    def focused_row(self):
+        if self.cursor is not None and self.cursor in self.selected:
+            return self.row_view(self.rows[self.cursor])
+        if self.selected:
+            return self.row_view(self.rows[max(self.selected)])
+        return None
+
+    # --- VIEWPORT ---
+    def on_configure(self, event=None):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        top = 0
+        if self.pool:
+            bbox = self.tree.bbox(self.pool[0])
+            if bbox: top = bbox[1]
+        visible = max(1, (self.tree.winfo_height() - top) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def max_offset(self):
+        return max(0, len(self.rows) - self.visible)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def scroll(self, n_rows):
+        self.scroll_to(self.offset + n_rows)
+        return "break"
+
+    def on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+
+    def render(self):
+        start = self.offset
+        count = max(0, min(self.visible + self.overscan, len(self.rows) - start))
+
+        # Grow / shrink the item pool to exactly `count` items, then re-fill in place
+        while len(self.pool) < count:
+            self.pool.append(self.tree.insert("", "end"))
+        if len(self.pool) > count:
+            self.tree.delete(*self.pool[count:])
+            del self.pool[count:]
+        for pos, iid in enumerate(self.pool):
+            idx = start + pos
+            r = self.rows[idx]
+            self.tree.item(iid, values=self.row_view(r), tags=(self.row_tag(r, idx),))
+
+        self.tree.selection_set([iid for pos, iid in enumerate(self.pool) if start + pos in self.selected])
+        total = len(self.rows)
+        if total:
+            self.vsb.set(start / total, min(1.0, (start + self.visible) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def see(self, idx):
+        if idx < self.offset:
+            self.scroll_to(idx)
+        elif idx >= self.offset + self.visible:
+            self.scroll_to(idx - self.visible + 1)
+
+    # --- SELECTION ---
+    def select(self, idx, state=0):
+        if state & SHIFT_MASK and self.anchor is not None:
+            lo, hi = sorted((self.anchor, idx))
+            span = set(range(lo, hi + 1))
+            self.selected = (self.selected | span) if state & CONTROL_MASK else span
+        elif state & CONTROL_MASK:
+            self.selected ^= {idx}
+            self.anchor = idx
+        else:
+            self.selected = {idx}
+            self.anchor = idx
+        self.cursor = idx
+        self.see(idx)
+        self.render()
+        self.event_generate("<<SelectionChanged>>")
+
+    def on_click(self, event):
+        # Headings / separators keep the normal Treeview behaviour
+        if self.tree.identify_region(event.x, event.y) not in ("cell", "tree"):
+            return None
+        iid = self.tree.identify_row(event.y)
+        if iid not in self.pool:
+            return "break"
+        self.tree.focus_set()
+        self.select(self.offset + self.pool.index(iid), event.state)
+        return "break"
+
+    def move_cursor(self, step, event):
+        if not self.rows:
+            return "break"
+        start = self.cursor if self.cursor is not None else self.offset
+        idx = max(0, min(start + step, len(self.rows) - 1))
+        self.select(idx, event.state & SHIFT_MASK)
+        return "break"
+
+    def select_all(self, event=None):
+        if self.rows:
+            self.selected = set(range(len(self.rows)))
+            self.render()
+            self.event_generate("<<SelectionChanged>>")
+        return "break"
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.cursor = self.anchor = None
+        self.render()